@@ -1,8 +1,11 @@
 import os
 import sqlite3
+import threading
 
 import dotenv
-from pandas import DataFrame
+import numpy as np
+from pandas import DataFrame, Series, to_numeric
+from pandas.api.types import pandas_dtype
 
 from interchange.logs.logger import Logger
 
@@ -17,6 +20,7 @@ class Database:
 
     def __init__(self) -> None:
         dotenv.load_dotenv()
+        self.lock = threading.Lock()
         self.connection = self._create_connection(
             db_path=os.environ["ITX_DATABASE_PATH"]
         )
@@ -29,7 +33,8 @@ class Database:
         Create a database connection.
         """
         try:
-            conn = sqlite3.connect(db_path)
+            # Connections may be shared by worker threads, serialised by the lock.
+            conn = sqlite3.connect(db_path, check_same_thread=False)
             log.logger.debug("Connected to SQLite database")
         except sqlite3.Error as e:
             log.logger.error(f"Error connecting to database: '{e}'")
@@ -48,18 +53,36 @@ class Database:
         Execute the given SQL statement.
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(sql_statement)
-            if commit_option:
-                self.connection.commit()
-            result: list[tuple] = cursor.fetchall()
-            cursor.close()
+            with self.lock:
+                cursor = self.connection.cursor()
+                cursor.execute(sql_statement)
+                if commit_option:
+                    self.connection.commit()
+                result: list[tuple] = cursor.fetchall()
+                cursor.close()
             log.logger.debug("SQL statement executed successfully")
             return result
         except sqlite3.Error as e:
             log.logger.error(f"Error executing SQL statement: '{e}'")
             return []
 
+    def _fetch(self, sql_statement: str) -> tuple[list[str], list[tuple]]:
+        """
+        Execute the given SQL query and return its column names and result rows.
+        """
+        try:
+            with self.lock:
+                cursor = self.connection.cursor()
+                cursor.execute(sql_statement)
+                columns = [description[0] for description in cursor.description]
+                result: list[tuple] = cursor.fetchall()
+                cursor.close()
+            log.logger.debug("SQL query executed successfully")
+            return columns, result
+        except sqlite3.Error as e:
+            log.logger.error(f"Error executing SQL query: '{e}'")
+            return [], []
+
     def _format_list(self, values: list[str | int | float]) -> list[str]:
         """
         Format a list of values to be used as part of a SQL statement.
@@ -88,6 +111,23 @@ class Database:
         log.logger.debug("Attempting to execute CREATE TABLE SQL statement")
         self._execute(sql_statement, commit_option=True)
 
+    def create_view(
+        self, view_name: str, table_name: str, fields_alias: dict[str, str]
+    ) -> None:
+        """
+        Create a view over a table exposing the given fields under their aliases.
+        """
+        fields_str = ", ".join(
+            [f'{fd} AS "{alias}"' for (fd, alias) in fields_alias.items()]
+        )
+        sql_statement = f"""
+            CREATE VIEW IF NOT EXISTS {view_name} AS
+            SELECT {fields_str}
+            FROM {table_name};
+            """
+        log.logger.debug("Attempting to execute CREATE VIEW SQL statement")
+        self._execute(sql_statement, commit_option=True)
+
     def drop_table(self, table_name: str) -> None:
         """
         Drop a table with the given table name.
@@ -117,16 +157,70 @@ class Database:
     def read_records(
         self,
         table_name: str,
-        fields: list[str],
+        fields: list[str] | None,
         where: dict[str, str | int | float] = {},
+        dtypes: dict[str, str] = {},
+        conditions: list[str] = [],
+        order_by: list[str] = [],
     ) -> DataFrame:
         """
         Read records from a table with a list of fields and an optional 'where' clause.
+        Reads every field of the table when no list of fields is given.
+        Fields with a numeric dtype hint are typed directly, other fields as strings.
+        Missing values keep integer fields as floats unless their dtype is nullable.
+        Additional SQL conditions and an ordering of the records can be given.
         """
-        fields_str = ", ".join(fields)
+        fields_str = ", ".join(fields) if fields else "*"
         sql_statement = f"""
             SELECT {fields_str}
             FROM {table_name}"""
+        fmt_where = self._format_dict(where)
+        where_list = [f"{fd} = {val}" for (fd, val) in fmt_where.items()] + conditions
+        if where_list:
+            where_str = " AND ".join(where_list)
+            sql_statement += f"""
+                WHERE {where_str}"""
+        if order_by:
+            order_str = ", ".join(order_by)
+            sql_statement += f"""
+                ORDER BY {order_str}"""
+        sql_statement += ";\n"
+        log.logger.debug("Attempting to execute SELECT SQL statement")
+        columns, result = self._fetch(sql_statement)
+        fields = fields or columns
+        if not dtypes:
+            return DataFrame(result, columns=fields, dtype=str)
+        positions = {fd: i for (i, fd) in enumerate(fields)}
+        text_fields = [fd for fd in fields if fd not in dtypes]
+        text_rows = [[row[positions[fd]] for fd in text_fields] for row in result]
+        result_df = DataFrame(text_rows, columns=text_fields, dtype=str)
+        for fd, dtype in dtypes.items():
+            # Values that are not numbers, such as empty strings, become missing.
+            values = Series([row[positions[fd]] for row in result], dtype=object)
+            numbers = to_numeric(values, errors="coerce")
+            # Plain integer dtypes cannot hold missing values, so those stay floats.
+            target = pandas_dtype(dtype)
+            if not (
+                isinstance(target, np.dtype)
+                and target.kind in "iu"
+                and numbers.isna().any()
+            ):
+                numbers = numbers.astype(target)
+            result_df[fd] = numbers
+        return result_df[fields]
+
+    def read_scalar(
+        self,
+        table_name: str,
+        field: str,
+        where: dict[str, str | int | float] = {},
+    ) -> str | int | float | None:
+        """
+        Read a single field value from the first record matching a 'where' clause.
+        """
+        sql_statement = f"""
+            SELECT {field}
+            FROM {table_name}"""
         if where:
             fmt_where = self._format_dict(where)
             where_str = " AND ".join(
@@ -134,11 +228,11 @@ class Database:
             )
             sql_statement += f"""
                 WHERE {where_str}"""
-        sql_statement += ";\n"
-        log.logger.debug("Attempting to execute SELECT SQL statement")
+        sql_statement += """
+            LIMIT 1;\n"""
+        log.logger.debug("Attempting to execute scalar SELECT SQL statement")
         result = self._execute(sql_statement)
-        result_df = DataFrame(result, columns=fields, dtype=str)
-        return result_df
+        return result[0][0] if result else None
 
     def update_records(
         self,
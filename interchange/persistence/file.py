@@ -1,8 +1,12 @@
 import os
+from collections.abc import Iterable, Iterator
 from enum import StrEnum, auto
 
 import dotenv
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from interchange.logs.logger import Logger
 from interchange.persistence.database import Database
@@ -99,20 +103,103 @@ class FileStorage:
     def write_plaintext(self) -> None:
         raise NotImplementedError
 
-    def read_binary(self) -> None:
-        raise NotImplementedError
+    def read_binary(
+        self,
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+    ) -> np.ndarray:
+        """
+        Memory-map a file and return its contents as an array of bytes.
+        """
+        try:
+            log.logger.debug(f"Searching for {client_id} file {file_id}")
+            filepath = self._get_file_path(layer, client_id, file_id, subdir)
+            log.logger.debug(f"Mapping {client_id} file {file_id}")
+            if os.path.getsize(filepath) == 0:
+                # Empty files cannot be mapped, but they hold no bytes to read.
+                return np.empty(0, dtype=np.uint8)
+            return np.memmap(filepath, dtype=np.uint8, mode="r")
+        except OSError as e:
+            log.logger.error(f"Error opening {client_id} file {file_id}: '{e}'")
+            return np.empty(0, dtype=np.uint8)
 
     def write_binary(self) -> None:
         raise NotImplementedError
 
     def read_parquet(
-        self, layer: Layer, client_id: str, file_id: str, subdir: str = ""
+        self,
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+        columns: list[str] | None = None,
+        **read_options,
     ) -> pd.DataFrame:
         """
-        Read the given parquet file into a dataframe.
+        Read the given parquet file into a dataframe, optionally only some columns.
+        Extra keyword arguments are passed through to the parquet reader.
+        """
+        filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
+        return pd.read_parquet(filepath, columns=columns, **read_options)
+
+    def read_parquet_table(
+        self,
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+        columns: list[str] | None = None,
+    ) -> pa.Table:
+        """
+        Read the given parquet file into an Arrow table, optionally only some columns.
+        """
+        filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
+        return pq.read_table(filepath, columns=columns, use_pandas_metadata=True)
+
+    def read_parquet_batches(
+        self,
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+        columns: list[str] | None = None,
+        batch_size: int = 128_000,
+        **to_pandas_options,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the given parquet file as a sequence of dataframe batches.
+        Batches keep the index a whole-file read would give their records.
+        Extra keyword arguments are passed through to the batch conversion.
         """
         filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
-        return pd.read_parquet(filepath)
+        parquet_file = pq.ParquetFile(filepath)
+        if parquet_file.metadata.num_rows == 0:
+            # Yield a single empty batch so consumers still produce an empty file.
+            table = parquet_file.read(columns=columns, use_pandas_metadata=True)
+            yield table.to_pandas(**to_pandas_options)
+            return
+        metadata = parquet_file.schema_arrow.pandas_metadata or {}
+        ranges = [i for i in metadata.get("index_columns", []) if isinstance(i, dict)]
+        if ranges and len(metadata["index_columns"]) > 1:
+            raise ValueError("Batches cannot keep a range level of a multi-index")
+        offset = 0
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_size, columns=columns, use_pandas_metadata=True
+        ):
+            data = batch.to_pandas(**to_pandas_options)
+            if ranges:
+                # Range indexes are stored as metadata, so continue them across batches.
+                start, step = ranges[0]["start"], ranges[0]["step"]
+                data.index = pd.RangeIndex(
+                    start + offset * step,
+                    start + (offset + len(data)) * step,
+                    step,
+                    name=ranges[0]["name"],
+                )
+            offset += len(data)
+            yield data
 
     def write_parquet(
         self,
@@ -121,11 +208,58 @@ class FileStorage:
         client_id: str,
         file_id: str,
         subdir: str = "",
+        **parquet_options,
     ) -> None:
         """
         Write the given dataframe to a parquet file. Overwrites file if exists.
+        Extra keyword arguments are passed through to the parquet writer.
         """
         log.logger.debug(f"Writing {client_id} file {file_id} to parquet")
         filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        data.to_parquet(filepath, index=True)
+        data.to_parquet(filepath, index=True, **parquet_options)
+
+    def write_parquet_table(
+        self,
+        table: pa.Table,
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+        **parquet_options,
+    ) -> None:
+        """
+        Write the given Arrow table to a parquet file. Overwrites file if exists.
+        Extra keyword arguments are passed through to the parquet writer.
+        """
+        log.logger.debug(f"Writing {client_id} file {file_id} table to parquet")
+        filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        pq.write_table(table, filepath, **parquet_options)
+
+    def write_parquet_batches(
+        self,
+        batches: Iterable[pd.DataFrame],
+        layer: Layer,
+        client_id: str,
+        file_id: str,
+        subdir: str = "",
+        **parquet_options,
+    ) -> None:
+        """
+        Write a sequence of dataframe batches to a single parquet file.
+        Overwrites file if exists. Extra keyword arguments go to the parquet writer.
+        """
+        log.logger.debug(f"Writing {client_id} file {file_id} to parquet in batches")
+        filepath = f"{self._get_file_path(layer, client_id, file_id, subdir)}.parquet"
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        writer = None
+        try:
+            for batch in batches:
+                table = pa.Table.from_pandas(batch, preserve_index=True)
+                if writer is None:
+                    writer = pq.ParquetWriter(filepath, table.schema, **parquet_options)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
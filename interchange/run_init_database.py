@@ -4,6 +4,7 @@ Procedure to create the database schema for the demo SQLite database.
 
 from interchange.logs.logger import Logger
 from interchange.persistence.database import Database
+from interchange.visa.interchange import VISA_RULES_VIEW_FIELDS
 
 
 log = Logger(__name__)
@@ -249,3 +250,11 @@ if __name__ == "__main__":
             "exchange_value": "NUMERIC",
         },
     )
+
+    for type_record, fields_alias in VISA_RULES_VIEW_FIELDS.items():
+        log.logger.info(f"Creating 'visa_rules_{type_record}' view")
+        db.create_view(
+            view_name=f"visa_rules_{type_record}",
+            table_name="visa_rules_2",
+            fields_alias=fields_alias,
+        )
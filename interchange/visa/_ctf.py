@@ -0,0 +1,363 @@
+import os
+from collections.abc import Collection, Sequence
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from interchange.logs.logger import Logger
+from interchange.persistence.file import FileStorage
+
+
+log = Logger(__name__)
+fs = FileStorage()
+
+# Files are scanned in chunks of this many bytes, so working copies stay small.
+CHUNK_SIZE = 64 << 20
+# Layouts of at most this many files are kept, evicting the oldest first.
+CTF_LAYOUTS_SIZE = 16
+# Offset, stride, width and count of the evenly laid out lines of loaded files,
+# by their path, size and modification time.
+_ctf_layouts: dict[tuple[str, int, int], tuple[int, int, int, int]] = {}
+
+
+def _strided_lines(
+    data: np.ndarray, offset: int, stride: int, width: int, count: int
+) -> np.ndarray:
+    """
+    Return lines of equal length and spacing as a strided view of their bytes.
+    """
+    return np.lib.stride_tricks.as_strided(
+        data[offset:], shape=(count, width), strides=(stride, 1), writeable=False
+    )
+
+
+def _line_ends(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Return the positions of the line breaks within a chunk of bytes.
+    """
+    chunk = data[offset : offset + CHUNK_SIZE]
+    following = data[offset + 1 : offset + CHUNK_SIZE + 1]
+    # Lone carriage returns also end lines, as with universal newlines.
+    lone = np.ones(len(chunk), dtype=bool)
+    lone[: len(following)] = following != ord("\n")
+    breaks = (chunk == ord("\n")) | ((chunk == ord("\r")) & lone)
+    return np.flatnonzero(breaks) + offset
+
+
+def _split_lines(
+    data: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, tuple[int, int, int, int] | None]:
+    """
+    Split bytes into non-empty lines laid out as rows of a 2-D matrix.
+    Returns the matrix, the length of each line and, if lines are evenly laid out,
+    their offset, stride, width and count.
+    """
+    ends = np.concatenate(
+        [np.empty(0, dtype=np.int64)]
+        + [_line_ends(data, offset) for offset in range(0, len(data), CHUNK_SIZE)]
+    )
+    if len(data) and data[-1] not in (ord("\n"), ord("\r")):
+        ends = np.append(ends, len(data))
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    # Carriage returns of CRLF line breaks are not part of the lines.
+    carriage = (ends > starts) & (data[np.maximum(ends - 1, 0)] == ord("\r"))
+    ends = ends - carriage
+    starts, ends = starts[ends > starts], ends[ends > starts]
+    lengths = ends - starts
+    if not len(lengths):
+        return np.empty((0, 0), dtype=np.uint8), lengths, None
+    width = int(lengths.max())
+    stride = int(starts[1] - starts[0]) if len(starts) > 1 else width
+    if (lengths == width).all() and (np.diff(starts) == stride).all():
+        layout = (int(starts[0]), stride, width, len(starts))
+        return _strided_lines(data, *layout), lengths, layout
+    # Otherwise gather lines into a matrix, padding short lines with NUL.
+    matrix = np.zeros((len(starts), width), dtype=np.uint8)
+    columns = np.arange(width)
+    # Blocks of lines are gathered at a time, so byte positions stay a chunk in size.
+    chunk_lines = max(CHUNK_SIZE // (width * columns.itemsize), 1)
+    for offset in range(0, len(starts), chunk_lines):
+        block = slice(offset, offset + chunk_lines)
+        positions = np.minimum(starts[block, None] + columns, len(data) - 1)
+        filled = columns < lengths[block, None]
+        matrix[block][filled] = data[positions[filled]]
+    return matrix, lengths, None
+
+
+def _drop_columns(records: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """
+    Copy line bytes into a new matrix without the columns of a position range.
+    """
+    count, width = records.shape
+    matrix = np.empty((count, width - (stop - start)), dtype=np.uint8)
+    # Both parts of a chunk of lines are copied while its bytes are still cached.
+    chunk_lines = max(CHUNK_SIZE // max(width, 1), 1)
+    for offset in range(0, count, chunk_lines):
+        chunk = slice(offset, offset + chunk_lines)
+        matrix[chunk, :start] = records[chunk, :start]
+        matrix[chunk, start:] = records[chunk, stop:]
+    return matrix
+
+
+def load_ctf_bytes(
+    layer: FileStorage.Layer, client_id: str, file_id: str, subdir=""
+) -> np.ndarray:
+    """
+    Load a Visa interchange file into a matrix of line bytes in the CTF format.
+    """
+    data = fs.read_binary(fs.Layer.LANDING, client_id, file_id, subdir=subdir)
+    # Every transform loads the file, so the layout found first is reused until
+    # the file changes.
+    key = None
+    if isinstance(data, np.memmap):
+        stat = os.stat(data.filename)
+        key = (data.filename, stat.st_size, stat.st_mtime_ns)
+    if key in _ctf_layouts:
+        records = _strided_lines(data, *_ctf_layouts[key])
+        header_length = records.shape[1]
+    else:
+        records, lengths, layout = _split_lines(data)
+        header_length = lengths[0] if len(lengths) else 0
+        if key is not None and layout is not None:
+            if len(_ctf_layouts) >= CTF_LAYOUTS_SIZE:
+                del _ctf_layouts[next(iter(_ctf_layouts))]
+            _ctf_layouts[key] = layout
+    match header_length:
+        case 168:
+            return records
+        case 170:
+            return _drop_columns(records, 2, 4)
+    log.logger.error("The Visa interchange file has an unknown line length")
+    return np.empty((0, 168), dtype=np.uint8)
+
+
+def _decode_lines(records: np.ndarray) -> np.ndarray:
+    """
+    Decode rows of Latin-1 line bytes into an array of strings.
+    """
+    # Trailing NUL padding of short lines is dropped by the string view.
+    width = records.shape[1]
+    lines = np.ascontiguousarray(records, dtype=np.uint32).view(f"U{width}")
+    return lines.ravel().astype(object)
+
+
+@lru_cache(maxsize=32)
+def _code_table(values: frozenset[str], width: int) -> np.ndarray:
+    """
+    Return a table of whether each code of one or two bytes is any value.
+    """
+    dtype = np.uint8 if width == 1 else np.uint16
+    encoded = [value.encode("latin-1") for value in values]
+    codes = np.frombuffer(b"".join(e for e in encoded if len(e) == width), dtype)
+    table = np.zeros(1 << (8 * width), dtype=bool)
+    table[codes] = True
+    return table
+
+
+def _slice_isin(
+    matrix: np.ndarray, start: int, stop: int, values: Collection[str]
+) -> np.ndarray:
+    """
+    Return whether the characters of each line in a position range are any value.
+    """
+    width = stop - start
+    window = np.ascontiguousarray(matrix[:, start:stop])
+    if width <= 2:
+        # Short codes index a table of every possible code instead of searching.
+        codes = window.view(np.uint8 if width == 1 else np.uint16).ravel()
+        return _code_table(frozenset(values), width)[codes]
+    codes = np.array([value.encode("latin-1") for value in values])
+    return np.isin(window.view(f"S{width}").ravel(), codes)
+
+
+def _parse_keys(window: np.ndarray) -> np.ndarray:
+    """
+    Return the numbers written as digits in each row of a window of line bytes.
+    """
+    digits = window - np.uint8(ord("0"))
+    if not (digits <= 9).all():
+        # Padded or invalid numbers are parsed, or rejected, like Python integers.
+        numbers = np.ascontiguousarray(window).view(f"S{window.shape[1]}")
+        return numbers.ravel().astype(np.int64)
+    keys = np.zeros(len(window), dtype=np.int64)
+    for position in range(window.shape[1]):
+        keys *= 10
+        keys += digits[:, position]
+    return keys
+
+
+def _scan_ctf(
+    records: np.ndarray,
+    filters: list[tuple[int, int, Collection[str]]],
+    start: int,
+    stop: int,
+    cols: Sequence[str],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Scan line bytes once for the lines kept by filters, their records and key columns.
+    Filters are position ranges of lines with their valid values.
+    """
+    bounds = [(start, stop)] + [(lo, hi) for lo, hi, _ in filters]
+    low = min(lo for lo, _ in bounds)
+    high = max(hi for _, hi in bounds)
+    chunk_lines = max(CHUNK_SIZE // max(records.shape[1], 1), 1)
+    lines, keys = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for offset in range(0, len(records), chunk_lines):
+        # Copy the positions read by filters and keys once; every check reads it.
+        window = np.ascontiguousarray(records[offset : offset + chunk_lines, low:high])
+        mask = np.ones(len(window), dtype=bool)
+        for lo, hi, values in filters:
+            mask &= _slice_isin(window, lo - low, hi - low, values)
+        lines.append(np.flatnonzero(mask) + offset)
+        keys.append(_parse_keys(window[mask, start - low : stop - low]))
+    lines, keys = np.concatenate(lines), np.concatenate(keys)
+    # A key that does not increase on the previous one starts a new record.
+    # Line ids of a file fit in 32 bits; stored record ids are still 64-bit.
+    record_ids = np.zeros(len(keys), dtype=np.int32)
+    np.cumsum(keys[1:] <= keys[:-1], out=record_ids[1:])
+    # Only distinct keys are named as strings to find their columns.
+    codes, distinct = pd.factorize(keys)
+    positions = pd.Index(cols).get_indexer(distinct.astype(str))[codes]
+    return lines, record_ids, positions
+
+
+def _line_lengths(lines: np.ndarray) -> np.ndarray:
+    """
+    Return the length of each row of line bytes without its trailing NUL padding.
+    """
+    width = lines.shape[1]
+    lengths = np.full(len(lines), width, dtype=np.int64)
+    if not width:
+        return lengths
+    short = np.flatnonzero(lines[:, -1] == 0)
+    if len(short):
+        filled = lines[short] != 0
+        trailing = np.argmax(filled[:, ::-1], axis=1)
+        lengths[short] = np.where(filled.any(axis=1), width - trailing, 0)
+    return lengths
+
+
+def _string_column(lines: np.ndarray, rows: np.ndarray, count: int) -> pa.Array:
+    """
+    Return rows of line bytes as a column of strings at the given rows, others empty.
+    """
+    if lines.size and lines.max() >= 0x80:
+        # Latin-1 characters beyond ASCII take two bytes in UTF-8, so decode them.
+        values = np.full(count, "", dtype=object)
+        values[rows] = _decode_lines(lines)
+        return pa.array(values, type=pa.large_string())
+    # ASCII bytes are already UTF-8, so the string data is the line bytes as is.
+    lengths = _line_lengths(lines)
+    sizes = np.zeros(count, dtype=np.int64)
+    sizes[rows] = lengths
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    if not (lengths == lines.shape[1]).all():
+        lines = lines[np.arange(lines.shape[1]) < lengths[:, None]]
+    data = np.ascontiguousarray(lines)
+    return pa.Array.from_buffers(
+        pa.large_string(), count, [None, pa.py_buffer(offsets), pa.py_buffer(data)]
+    )
+
+
+def _scatter_lines(
+    records: np.ndarray,
+    lines: np.ndarray,
+    rows: np.ndarray,
+    positions: np.ndarray,
+    record_ids: np.ndarray,
+    cols: Sequence[str],
+) -> pa.Table:
+    """
+    Scatter line values into the cells of their row and key column of records.
+    """
+    columns = [
+        _string_column(
+            records[lines[positions == column]],
+            rows[positions == column],
+            len(record_ids),
+        )
+        for column in range(len(cols))
+    ]
+    # Record ids are stored as a column, so batched readers keep them.
+    layout = pd.DataFrame(
+        [[""] * len(cols)],
+        index=pd.Index([0], name="record"),
+        columns=pd.Index(cols, name="key"),
+    )
+    return pa.Table.from_arrays(
+        columns + [pa.array(record_ids, type=pa.int64())],
+        names=[*cols, "record"],
+        metadata=pa.Schema.from_pandas(layout, preserve_index=True).metadata,
+    )
+
+
+def pivot_on_key(
+    records: np.ndarray,
+    start: int,
+    stop: int,
+    cols: Sequence[str],
+    filters: list[tuple[int, int, Collection[str]]] = [],
+) -> pa.Table:
+    """
+    Pivot line bytes kept by filters into a table of records by a sorted numerical key.
+    """
+    lines, record_ids, positions = _scan_ctf(records, filters, start, stop, cols)
+    record_count = int(record_ids[-1]) + 1 if len(record_ids) else 0
+    # Lines of keys that are not columns are dropped.
+    kept = positions >= 0
+    return _scatter_lines(
+        records,
+        lines[kept],
+        record_ids[kept],
+        positions[kept],
+        np.arange(record_count),
+        cols,
+    )
+
+
+def pivot_groups_on_key(
+    records: np.ndarray,
+    start: int,
+    stop: int,
+    cols: Sequence[str],
+    group_col: str,
+    group_start: int,
+    group_stop: int,
+    groups: Collection[str],
+    filters: list[tuple[int, int, Collection[str]]] = [],
+) -> dict[str, pa.Table]:
+    """
+    Pivot line bytes kept by filters into records by a sorted numerical key, split
+    into groups by the characters of a position range in a key column of records.
+    Records keep the ids they would have in a single pivot of every line.
+    """
+    lines, record_ids, positions = _scan_ctf(records, filters, start, stop, cols)
+    record_count = int(record_ids[-1]) + 1 if len(record_ids) else 0
+    kept = positions >= 0
+    lines, record_ids, positions = lines[kept], record_ids[kept], positions[kept]
+    # Label records once from their group column line; records without one have none.
+    heads = positions == list(cols).index(group_col)
+    width = group_stop - group_start
+    labels = np.zeros((record_count, width), dtype=np.uint8)
+    labels[record_ids[heads]] = records[lines[heads], group_start:group_stop]
+    labels = labels.view(f"S{width}").ravel()
+    labelled = np.zeros(record_count, dtype=bool)
+    labelled[record_ids[heads]] = True
+    line_labels = labels[record_ids]
+    pivots = {}
+    for group in groups:
+        code = group.encode("latin-1")
+        group_ids = np.flatnonzero(labelled & (labels == code))
+        group_lines = labelled[record_ids] & (line_labels == code)
+        pivots[group] = _scatter_lines(
+            records,
+            lines[group_lines],
+            np.searchsorted(group_ids, record_ids[group_lines]),
+            positions[group_lines],
+            group_ids,
+            cols,
+        )
+    return pivots
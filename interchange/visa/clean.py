@@ -1,4 +1,7 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 
 import pandas as pd
 
@@ -10,13 +13,30 @@ from interchange.persistence.file import FileStorage
 log = Logger(__name__)
 fs = FileStorage()
 
+FILE_DATE_FORMAT = "%Y-%m-%d"
+# Large row groups with 1 MiB pages keep downstream scans parallel and sequential.
+PARQUET_OPTIONS = {
+    "row_group_size": 1_000_000,
+    "data_page_size": 1 << 20,
+    "compression": "zstd",
+    "use_dictionary": True,
+    "version": "2.6",
+}
+
+
+@lru_cache(maxsize=1)
+def _database() -> Database:
+    """
+    Return the module's database connection, opened on first use.
+    """
+    return Database()
+
 
 def _load_visa_field_definitions(type_record: str, sort_by: list[str]) -> pd.DataFrame:
     """
     Return a dataframe of Visa field definitions ordered by specific fields.
     """
-    db = Database()
-    fd = db.read_records(
+    fd = _database().read_records(
         table_name="visa_fields",
         fields=[
             "type_record",
@@ -31,7 +51,7 @@ def _load_visa_field_definitions(type_record: str, sort_by: list[str]) -> pd.Dat
     fd[int_cols] = fd[int_cols].apply(
         pd.to_numeric, downcast="integer", errors="coerce"
     )
-    return fd.sort_values(sort_by, ascending=True)
+    return fd if not sort_by else fd.sort_values(sort_by, ascending=True)
 
 
 def _retrieve_file_date(
@@ -41,29 +61,23 @@ def _retrieve_file_date(
     """
     Retrieve a file's processing date in 'YYYY-MM-DD' string format.
     """
-    db = Database()
-    file_date = db.read_records(
+    file_date = _database().read_scalar(
         table_name="file_control",
-        fields=[
-            "brand_id",
-            "file_type",
-            "file_processing_date",
-            "landing_file_name",
-        ],
+        field="file_processing_date",
         where={
             "client_id": client_id,
             "file_id": file_id,
         },
-    ).iloc[0]
-    return file_date["file_processing_date"]
+    )
+    return str(file_date)
 
 
-def _parse_dates(date_series: pd.Series, date_format: str, file_date: str) -> pd.Series:
+def _parse_dates(
+    date_series: pd.Series, date_format: str, reference_date: datetime
+) -> pd.Series:
     """
     Parse a series of formatted string dates into datetime objects.
     """
-    FILE_DATE_FORMAT = "%Y-%m-%d"
-    reference_date = datetime.strptime(file_date, FILE_DATE_FORMAT)
     match date_format:
         case date_format if date_format.startswith("%"):
             result = pd.to_datetime(date_series, format=date_format, errors="coerce")
@@ -107,16 +121,20 @@ def _parse_dates(date_series: pd.Series, date_format: str, file_date: str) -> pd
 
 
 def _clean_field_values(
-    field_series: pd.Series, field_defs: pd.DataFrame, file_date: str
+    field_series: pd.Series,
+    definitions: dict[str, pd.Series],
+    reference_date: datetime,
 ) -> pd.Series:
     """
     Perform data cleaning on a series of values depending on its target data type.
     """
-    name = field_series.name
-    definition = field_defs[field_defs["column_name"] == name].iloc[0]
+    definition = definitions[str(field_series.name)]
     match definition["column_type"]:
         case "str":
-            result = field_series.str.strip().replace("", " ")
+            result = field_series.str.strip()
+            empties = result.eq("")
+            if empties.any():
+                result = result.mask(empties, " ")
         case "int":
             pre = field_series.str.strip()
             result = pd.to_numeric(pre, errors="coerce").astype("Int64")
@@ -154,12 +172,39 @@ def _clean_field_values(
             if not date_format:
                 raise ValueError
             pre = field_series.str.strip()
-            result = _parse_dates(pre, date_format, file_date)
+            result = _parse_dates(pre, date_format, reference_date)
         case _:
             raise NotImplementedError
     return result
 
 
+def _clean_fields(
+    data: pd.DataFrame, field_defs: pd.DataFrame, reference_date: datetime
+) -> pd.DataFrame:
+    """
+    Clean every field of a dataframe, dispatching each column to a worker thread.
+    """
+    # Index definitions by column name so workers only perform dictionary lookups.
+    definitions: dict[str, pd.Series] = {}
+    for _, definition in field_defs.iterrows():
+        definitions.setdefault(definition["column_name"], definition)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        fields = list(
+            executor.map(
+                lambda field_series: _clean_field_values(
+                    field_series, definitions, reference_date
+                ),
+                (field_series for _, field_series in data.items()),
+            )
+        )
+    # Every cleaned field shares the input index, so no alignment is needed.
+    return pd.DataFrame(
+        {column: field.array for column, field in zip(data.columns, fields)},
+        index=data.index,
+        copy=False,
+    )
+
+
 def clean_baseii_fields(
     origin_layer: FileStorage.Layer,
     target_layer: FileStorage.Layer,
@@ -175,6 +220,7 @@ def clean_baseii_fields(
     field_defs = _load_visa_field_definitions("draft", sort_by=[])
     log.logger.info(f"Retrieving file processing date for {client_id} file {file_id}")
     file_date = _retrieve_file_date(client_id, file_id)
+    reference_date = datetime.strptime(file_date, FILE_DATE_FORMAT)
     log.logger.info(
         f"Reading extracted BASE II Transactions from {client_id} file {file_id}"
     )
@@ -187,13 +233,16 @@ def clean_baseii_fields(
     log.logger.info(
         f"Cleaning extracted BASE II Transactions from {client_id} file {file_id}"
     )
-    fields = []
-    for _, field_series in data.items():
-        clean_field = _clean_field_values(field_series, field_defs, file_date)
-        fields.append(clean_field)
-    clean_df = pd.concat(fields, axis=1)
+    clean_df = _clean_fields(data, field_defs, reference_date)
     log.logger.info(f"Saving Visa Draft clean fields from {client_id} file {file_id}")
-    fs.write_parquet(clean_df, target_layer, client_id, file_id, subdir=target_subdir)
+    fs.write_parquet(
+        clean_df,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
 
 
 def clean_sms_fields(
@@ -211,6 +260,7 @@ def clean_sms_fields(
     field_defs = _load_visa_field_definitions("sms", sort_by=[])
     log.logger.info(f"Retrieving file processing date for {client_id} file {file_id}")
     file_date = _retrieve_file_date(client_id, file_id)
+    reference_date = datetime.strptime(file_date, FILE_DATE_FORMAT)
     log.logger.info(
         f"Reading extracted BASE II Transactions from {client_id} file {file_id}"
     )
@@ -223,13 +273,16 @@ def clean_sms_fields(
     log.logger.info(
         f"Cleaning extracted BASE II Transactions from {client_id} file {file_id}"
     )
-    fields = []
-    for _, field_series in data.items():
-        clean_field = _clean_field_values(field_series, field_defs, file_date)
-        fields.append(clean_field)
-    clean_df = pd.concat(fields, axis=1)
+    clean_df = _clean_fields(data, field_defs, reference_date)
     log.logger.info(f"Saving Visa Draft clean fields from {client_id} file {file_id}")
-    fs.write_parquet(clean_df, target_layer, client_id, file_id, subdir=target_subdir)
+    fs.write_parquet(
+        clean_df,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
 
 
 def clean_vss_fields(
@@ -267,6 +320,7 @@ def clean_vss_fields(
     
     log.logger.info(f"Retrieving file processing date for {client_id} file {file_id}")
     file_date = _retrieve_file_date(client_id, file_id)
+    reference_date = datetime.strptime(file_date, FILE_DATE_FORMAT)
     
     log.logger.info(f"Cleaning fields for VSS variants: {', '.join(vss_types)}")
     
@@ -286,13 +340,16 @@ def clean_vss_fields(
                 subdir=origin_subdir,
             )
             log.logger.info(f"Cleaning extracted VSS {vss_type} records from {client_id} file {file_id}")
-            fields = []
-            for _, field_series in data.items():
-                clean_field = _clean_field_values(field_series, field_defs, file_date)
-                fields.append(clean_field)
-            clean_df = pd.concat(fields, axis=1)
+            clean_df = _clean_fields(data, field_defs, reference_date)
             log.logger.info(f"Saving Visa VSS {vss_type} clean fields from {client_id} file {file_id}")
-            fs.write_parquet(clean_df, target_layer, client_id, file_id, subdir=target_subdir)
+            fs.write_parquet(
+                clean_df,
+                target_layer,
+                client_id,
+                file_id,
+                subdir=target_subdir,
+                **PARQUET_OPTIONS,
+            )
             
         except Exception as e:
             log.logger.error(f"Error cleaning VSS {vss_type}: {str(e)}")
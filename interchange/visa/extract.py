@@ -1,4 +1,11 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from interchange.logs.logger import Logger
 from interchange.persistence.database import Database
@@ -8,13 +15,40 @@ from interchange.persistence.file import FileStorage
 log = Logger(__name__)
 fs = FileStorage()
 
+# Extracted fields are low-cardinality codes that compress well with dictionaries.
+PARQUET_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+    "data_page_size": 1 << 20,
+}
+
+
+@lru_cache(maxsize=1)
+def _database() -> Database:
+    """
+    Return the module's database connection, opened on first use.
+    """
+    return Database()
+
 
-def _load_visa_field_definitions(type_record: str, sort_by: list[str]) -> pd.DataFrame:
+def _load_visa_field_definitions(
+    type_record: str, sort_by: tuple[str, ...]
+) -> pd.DataFrame:
     """
     Return a dataframe of Visa field definitions ordered by specific fields.
     """
-    db = Database()
-    fd = db.read_records(
+    return _read_visa_field_definitions(type_record, sort_by).copy()
+
+
+@lru_cache(maxsize=16)
+def _read_visa_field_definitions(
+    type_record: str, sort_by: tuple[str, ...]
+) -> pd.DataFrame:
+    """
+    Read and cache Visa field definitions ordered by specific fields.
+    """
+    fd = _database().read_records(
         table_name="visa_fields",
         fields=[
             "type_record",
@@ -38,7 +72,91 @@ def _load_visa_field_definitions(type_record: str, sort_by: list[str]) -> pd.Dat
     fd[int_cols] = fd[int_cols].apply(
         pd.to_numeric, downcast="integer", errors="coerce"
     )
-    return fd.sort_values(sort_by, ascending=True)
+    return fd.sort_values(list(sort_by), ascending=True)
+
+
+def _record_matrix(record: pd.Series, width: int) -> np.ndarray:
+    """
+    Return a record column as a 2-D matrix of character codes of a fixed width.
+    """
+    # Pad with NUL so short records read as empty, exactly like string slicing.
+    array = pc.utf8_rpad(
+        pc.utf8_slice_codeunits(pa.array(record, type=pa.large_string()), 0, width),
+        width=width,
+        padding="\x00",
+    )
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    rows = len(array)
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset :]
+    if rows and offsets[rows] - offsets[0] == rows * width:
+        # Every character is a single UTF-8 byte: view the Arrow buffer directly.
+        values = np.frombuffer(
+            array.buffers()[2], dtype=np.uint8, count=rows * width, offset=offsets[0]
+        )
+        return values.reshape(rows, width)
+    values = record.to_numpy(dtype=f"U{width}")
+    matrix = values.view(np.uint32).reshape(rows, width)
+    # Latin-1 decoded records fit in one byte per character.
+    if rows and matrix.max() < 256:
+        return matrix.astype(np.uint8)
+    return matrix
+
+
+def _slice_matrix(matrix: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """
+    Return a column window of a character matrix as an array of strings.
+    """
+    window = np.ascontiguousarray(matrix[:, start:stop], dtype=np.uint32)
+    return window.view(f"U{stop - start}").ravel()
+
+
+def _extract_fields(data: pd.DataFrame, field_defs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract fixed-width fields from record columns as defined by field definitions.
+    """
+    field_defs = field_defs.assign(
+        start=field_defs["position"] - 1,
+        stop=field_defs["position"] + field_defs["length"] - 1,
+        sid_start=field_defs["secondary_identifier_pos"] - 1,
+        sid_stop=field_defs["secondary_identifier_pos"]
+        + field_defs["secondary_identifier_len"]
+        - 1,
+    )
+    # Lay out each record column once as a matrix wide enough for all its fields.
+    widths = field_defs[["stop", "sid_stop"]].max(axis=1).groupby(field_defs["tcsn"])
+    matrices = {
+        tcsn: _record_matrix(data[tcsn], int(width))
+        for tcsn, width in widths.max().items()
+    }
+    # Arrow-backed reads carry an Arrow index; keep NumPy record ids for joins.
+    records = data.index.astype(np.int64)
+    extracted = {}
+    # Compute each secondary condition once for all fields that share it.
+    groups = field_defs.groupby(
+        ["tcsn", "sid_start", "sid_stop", "secondary_identifier"],
+        sort=False,
+        dropna=False,
+    )
+    for (tcsn, sid_start, sid_stop, sid), defs in groups:
+        matrix = matrices[tcsn]
+        if sid:
+            # Gather rows that match secondary condition once for the whole group.
+            mask = _slice_matrix(matrix, int(sid_start), int(sid_stop)) == sid
+            matrix = matrix[mask]
+        for label, fd in defs.iterrows():
+            values = _slice_matrix(matrix, int(fd["start"]), int(fd["stop"]))
+            if sid:
+                # Rows that do not match secondary condition are left empty.
+                field = np.zeros(len(records), dtype=values.dtype)
+                field[mask] = values
+                values = field
+            extracted[label] = values.astype(object)
+    fields = {
+        field_defs.at[label, "column_name"]: extracted[label]
+        for label in field_defs.index
+    }
+    return pd.DataFrame(fields, index=records, copy=False)
 
 
 def extract_baseii_fields(
@@ -54,43 +172,28 @@ def extract_baseii_fields(
     """
     log.logger.info("Loading Visa Draft field definitions")
     field_defs = _load_visa_field_definitions(
-        "draft", sort_by=["tcsn", "position", "secondary_identifier_len"]
+        "draft", sort_by=("tcsn", "position", "secondary_identifier_len")
     )
     log.logger.info(f"Reading Raw BASE II Transactions from {client_id} file {file_id}")
-    data = fs.read_parquet(
+    batches = fs.read_parquet_batches(
         origin_layer,
         client_id,
         file_id,
         subdir=origin_subdir,
+        columns=field_defs["tcsn"].unique().tolist(),
+        types_mapper=pd.ArrowDtype,
+    )
+    log.logger.info(
+        f"Extracting and saving Visa Draft fields from {client_id} file {file_id}"
+    )
+    fs.write_parquet_batches(
+        (_extract_fields(data, field_defs) for data in batches),
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
     )
-    log.logger.info(f"Extracting Visa Draft fields from {client_id} file {file_id}")
-    fields = []
-    for _, fd in field_defs.iterrows():
-        if not fd["secondary_identifier"]:
-            # Use entire dataframe.
-            data_view = data
-        else:
-            # Filter for rows that match secondary condition.
-            data_view = data[
-                data[fd["tcsn"]].str.slice(
-                    start=fd["secondary_identifier_pos"] - 1,
-                    stop=fd["secondary_identifier_pos"]
-                    + fd["secondary_identifier_len"]
-                    - 1,
-                )
-                == fd["secondary_identifier"]
-            ]
-        # Get field values from data view.
-        field = pd.Series(
-            data_view[fd["tcsn"]].str.slice(
-                start=fd["position"] - 1, stop=fd["position"] + fd["length"] - 1
-            ),
-            name=fd["column_name"],
-        )
-        fields.append(field)
-    extract_df = pd.concat(fields, axis=1).fillna("").astype(str)
-    log.logger.info(f"Saving Visa Draft fields from {client_id} file {file_id}")
-    fs.write_parquet(extract_df, target_layer, client_id, file_id, subdir=target_subdir)
 
 
 def extract_sms_fields(
@@ -106,7 +209,7 @@ def extract_sms_fields(
     """
     log.logger.info("Loading Visa SMS field definitions")
     field_defs = _load_visa_field_definitions(
-        "sms", sort_by=["secondary_identifier", "position"]
+        "sms", sort_by=("secondary_identifier", "position")
     )
     field_defs = field_defs[field_defs["secondary_identifier"] != "V22000"]
     log.logger.info(f"Reading Raw SMS Transactions from {client_id} file {file_id}")
@@ -115,24 +218,71 @@ def extract_sms_fields(
         client_id,
         file_id,
         subdir=origin_subdir,
+        columns=field_defs["secondary_identifier"].str.slice(1).unique().tolist(),
+        dtype_backend="pyarrow",
     )
+    # Files without SMS records store null-typed columns; slice them as strings.
+    data = data.astype(pd.ArrowDtype(pa.string()))
     log.logger.info(f"Extracting Visa SMS fields from {client_id} file {file_id}")
-    fields = []
+    fields = {}
     for _, fd in field_defs.iterrows():
-        fd["secondary_identifier"] = fd["secondary_identifier"][1:]
-        data_view = data
-
-        field = pd.Series(
-            data_view[fd["secondary_identifier"]].str.slice(
-                start=fd["position"] - 1, stop=fd["position"] + fd["length"] - 1
-            ),
-            name=fd["column_name"],
+        # Arrow-backed strings are sliced by Arrow kernels without Python objects.
+        field = data[fd["secondary_identifier"][1:]].str.slice(
+            start=int(fd["position"] - 1), stop=int(fd["position"] + fd["length"] - 1)
         )
-        fields.append(field)
-
-    extract_df = pd.concat(fields, axis=1).fillna("").astype(str)
+        fields[fd["column_name"]] = field.to_numpy(dtype=object)
+    # Arrow-backed reads carry an Arrow index; keep NumPy record ids for joins.
+    records = data.index.astype(np.int64)
+    extract_df = pd.DataFrame(fields, index=records, dtype=str)
     log.logger.info(f"Saving Visa SMS fields from {client_id} file {file_id}")
-    fs.write_parquet(extract_df, target_layer, client_id, file_id, subdir=target_subdir)
+    fs.write_parquet(
+        extract_df,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
+
+
+def _extract_vss_type(
+    origin_layer: FileStorage.Layer,
+    target_layer: FileStorage.Layer,
+    client_id: str,
+    file_id: str,
+    vss_type: str,
+    origin_subdir: str,
+    target_subdir: str,
+) -> None:
+    """
+    Extract specific fields of a single VSS variant from raw settlement data.
+    """
+    type_record = f"vss_{vss_type}"
+    log.logger.info(f"Loading Visa {type_record} field definitions")
+    field_defs = _load_visa_field_definitions(
+        type_record, sort_by=("tcsn", "position", "secondary_identifier_len")
+    )
+    log.logger.info(f"Reading Raw VSS {vss_type} records from {client_id} file {file_id}")
+    batches = fs.read_parquet_batches(
+        origin_layer,
+        client_id,
+        file_id,
+        subdir=origin_subdir,
+        columns=field_defs["tcsn"].unique().tolist(),
+        types_mapper=pd.ArrowDtype,
+    )
+    log.logger.info(
+        f"Extracting and saving Visa VSS {vss_type} fields "
+        f"from {client_id} file {file_id}"
+    )
+    fs.write_parquet_batches(
+        (_extract_fields(data, field_defs) for data in batches),
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
 
 
 def extract_vss_fields(
@@ -170,52 +320,27 @@ def extract_vss_fields(
     
     log.logger.info(f"Extracting fields for VSS variants: {', '.join(vss_types)}")
     
-    for vss_type in vss_types:
-        try:
-            type_record = f"vss_{vss_type}"
-            origin_subdir = origin_subdir_template.format(vss_type=vss_type)
-            target_subdir = target_subdir_template.format(vss_type=vss_type)
-            
-            log.logger.info(f"Loading Visa {type_record} field definitions")
-            field_defs = _load_visa_field_definitions(
-                type_record, sort_by=["tcsn", "position", "secondary_identifier_len"]
-            )
-            log.logger.info(f"Reading Raw VSS {vss_type} records from {client_id} file {file_id}")
-            data = fs.read_parquet(
+    # Each variant reads and writes its own files, so they run in separate processes.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(len(vss_types), 1), mp_context=context
+    ) as executor:
+        futures = {
+            vss_type: executor.submit(
+                _extract_vss_type,
                 origin_layer,
+                target_layer,
                 client_id,
                 file_id,
-                subdir=origin_subdir,
+                vss_type,
+                origin_subdir_template.format(vss_type=vss_type),
+                target_subdir_template.format(vss_type=vss_type),
             )
-            log.logger.info(f"Extracting Visa VSS {vss_type} fields from {client_id} file {file_id}")
-            fields = []
-            for _, fd in field_defs.iterrows():
-                if not fd["secondary_identifier"]:
-                    # Use entire dataframe.
-                    data_view = data
-                else:
-                    # Filter for rows that match secondary condition.
-                    data_view = data[
-                        data[fd["tcsn"]].str.slice(
-                            start=fd["secondary_identifier_pos"] - 1,
-                            stop=fd["secondary_identifier_pos"]
-                            + fd["secondary_identifier_len"]
-                            - 1,
-                        )
-                        == fd["secondary_identifier"]
-                    ]
-                # Get field values from data view.
-                field = pd.Series(
-                    data_view[fd["tcsn"]].str.slice(
-                        start=fd["position"] - 1, stop=fd["position"] + fd["length"] - 1
-                    ),
-                    name=fd["column_name"],
-                )
-                fields.append(field)
-            extract_df = pd.concat(fields, axis=1).fillna("").astype(str)
-            log.logger.info(f"Saving Visa VSS {vss_type} fields from {client_id} file {file_id}")
-            fs.write_parquet(extract_df, target_layer, client_id, file_id, subdir=target_subdir)
-            
-        except Exception as e:
-            log.logger.error(f"Error extracting VSS {vss_type}: {str(e)}")
-            raise
\ No newline at end of file
+            for vss_type in vss_types
+        }
+        for vss_type, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log.logger.error(f"Error extracting VSS {vss_type}: {str(e)}")
+                raise
@@ -1,4 +1,10 @@
+import operator
+import re
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
@@ -11,13 +17,152 @@ from interchange.persistence.file import FileStorage
 log = Logger(__name__)
 fs = FileStorage()
 
+# Characters removed by Python's str.strip() from Latin-1 decoded text.
+_WHITESPACE = "".join(chr(code) for code in range(256) if chr(code).isspace())
+# Comparison conditions start with an operator, two-character operators first.
+_COMPARISON_PATTERN = re.compile(r"(<=|>=|<|>|=)(.*)", re.DOTALL)
+# Assigned rule fields repeat a few values per file and compress well with dictionaries.
+PARQUET_OPTIONS = {
+    "row_group_size": 1_000_000,
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+}
+# Rule criteria of each record type, named as the record type's transaction columns.
+VISA_RULES_VIEW_FIELDS = {
+    "draft": {
+        "region_country_code": "region_country_code",
+        "valid_from": "valid_from",
+        "valid_until": "valid_until",
+        "intelica_id": "intelica_id",
+        "fee_descriptor": "fee_descriptor",
+        "fee_currency": "fee_currency",
+        "fee_variable": "fee_variable",
+        "fee_fixed": "fee_fixed",
+        "fee_min": "fee_min",
+        "fee_cap": "fee_cap",
+        "business_mode": "business_mode",
+        "issuer_country": "issuer_country",
+        "issuer_region": "issuer_region",
+        "technology_indicator": "technology_indicator",
+        "product_id": "product_id",
+        "fast_funds": "fast_funds",
+        "travel_indicator": "travel_indicator",
+        "b2b_program_id": "b2b_program_id",
+        "account_funding_source": "funding_source",
+        "nnss_indicator": "nnss_indicator",
+        "product_subtype": "product_subtype",
+        "transaction_code": "draft_code",
+        "transaction_code_qualifier": "draft_code_qualifier_0",
+        "issuer_bin_8": "issuer_bin_8",
+        "acquirer_bin": "account_reference_number_acquiring_identifier",
+        "acquirer_business_id": "acquirer_business_id",
+        "transaction_amount_currency": "transaction_amount_currency",
+        "transaction_amount": "source_amount",
+        "merchant_country_code": "jurisdiction_country",
+        "merchant_country_region": "jurisdiction_region",
+        "merchant_category_code": "merchant_category_code",
+        "requested_payment_service": "requested_payment_service",
+        "usage_code": "usage_code",
+        "authorization_characteristics_indicator": "authorization_characteristics_indicator",
+        "authorization_code": "authorization_code",
+        "pos_terminal_capability": "pos_terminal_capacity",
+        "cardholder_id_method": "cardholder_id_method",
+        "pos_entry_mode": "pos_entry_mode",
+        "timeliness": "timeliness",
+        "reimbursement_attribute": "reimbursement_attribute",
+        "special_condition_indicator": "special_condition_indicator_merchant_draft_indicator",
+        "fee_program_indicator": "fee_program_indicator",
+        "moto_eci_indicator": "moto_ec_indicator",
+        "acceptance_terminal_indicator": "acceptance_terminal_indicator",
+        "prepaid_card_indicator": "prepaid_card_indicator",
+        "pos_environment_code": "pos_environment",
+        "business_format_code": "business_format_code",
+        "business_application_id": "business_application_id",
+        "type_purchase": "type_of_purchase",
+        "network_identification_code": "network_identification_code",
+        "message_reason_code": "message_reason_code",
+        "surcharge_amount": "surcharge_amount",
+        "authorized_amount": "authorized_amount",
+        "authorization_response_code": "authorization_response_code",
+        "merchant_verification_value": "merchant_verification_value",
+        "dynamic_currency_conversion_indicator": "dcc_indicator",
+        "cvv2_result_code": "cvv_result_code",
+        "national_tax_indicator": "national_tax_included",
+        "merchant_vat": "merchant_vat_registration_number",
+        "summary_commodity": "summary_commodity_code",
+    },
+    "sms": {
+        "region_country_code": "region_country_code",
+        "valid_from": "valid_from",
+        "valid_until": "valid_until",
+        "intelica_id": "intelica_id",
+        "fee_descriptor": "fee_descriptor",
+        "fee_currency": "fee_currency",
+        "fee_variable": "fee_variable",
+        "fee_fixed": "fee_fixed",
+        "fee_min": "fee_min",
+        "fee_cap": "fee_cap",
+        "business_mode": "business_mode",
+        "issuer_country": "issuer_country",
+        "issuer_region": "issuer_region",
+        "technology_indicator": "technology_indicator",
+        "product_id": "product_id",
+        "fast_funds": "fast_funds",
+        "travel_indicator": "travel_indicator",
+        "b2b_program_id": "b2b_program_id",
+        "account_funding_source": "funding_source",
+        "nnss_indicator": "nnss_indicator",
+        "product_subtype": "product_subtype",
+        "transaction_code": "transaction_code_sms",
+        "issuer_bin_8": "issuer_bin_8",
+        "acquirer_bin": "acquirer_bin",
+        "acquirer_business_id": "acquirer_business_id_sms",
+        "transaction_amount": "source_amount",
+        "merchant_country_code": "jurisdiction_country",
+        "merchant_country_region": "jurisdiction_region",
+        "merchant_category_code": "merchant's_type",
+        "requested_payment_service": "requested_payment_service",
+        "usage_code": "usage_code_sms",
+        "authorization_characteristics_indicator": "authorization_characteristics_indicator_sms",
+        "authorization_code": "authorization_code_valid",
+        "pos_terminal_capability": "pos_terminal_entry_capability",
+        "cardholder_id_method": "customer_identification_method",
+        "pos_entry_mode": "pos_entry_mode_sms",
+        "timeliness": "timeliness",
+        "reimbursement_attribute": "reimbursement_attribute_sms",
+        "special_condition_indicator": "chargeback_special_condition_merchant_indicator",
+        "fee_program_indicator": "fee_program_indicator_sms",
+        "moto_eci_indicator": "mail_telephone_or_electronic_commerce_indicator",
+        "acceptance_terminal_indicator": "pos_terminal_type",
+        "pos_environment_code": "recurring_payment_indicator_flag",
+        "business_application_id": "business_application_identifier",
+        "network_identification_code": "network_id",
+        "message_reason_code": "message_reason_code_sms",
+        "surcharge_amount": "surcharge_amount_sms",
+        "authorization_response_code": "response_code",
+        "merchant_verification_value": "mvv_code",
+        "dynamic_currency_conversion_indicator": "dcc_indicator_sms",
+        "cvv2_result_code": "cvv_result_code_sms",
+        "processing_code_transaction_type": "processing_code_transaction_type",
+        "point_of_service_condition_code": "pos_condition_code",
+    },
+}
+
+
+@lru_cache(maxsize=1)
+def _database() -> Database:
+    """
+    Return the module's database connection, opened on first use.
+    """
+    return Database()
+
 
 def _get_file_data(client_id: str, file_id: str) -> pd.Series:
     """
     Get key metadata associated to an interchange file.
     """
-    db = Database()
-    fd = db.read_records(
+    fd = _database().read_records(
         table_name="file_control",
         fields=[
             "brand_id",
@@ -36,188 +181,82 @@ def _get_visa_rule_definitions(file_date: date, type_record: str) -> pd.DataFram
     """
     Get Visa's interchange rule assignment criteria for the file's processing date.
     """
-    db = Database()
-    df = db.read_records(
+    return _read_visa_rule_definitions(file_date, type_record).copy()
+
+
+@lru_cache(maxsize=8)
+def _create_visa_rules_view(type_record: str) -> str:
+    """
+    Create the view of a record type's rule criteria if missing, and return its name.
+    """
+    # Databases built before the views existed get them on their first read.
+    view_name = f"visa_rules_{type_record}"
+    _database().create_view(
+        view_name=view_name,
         table_name="visa_rules_2",
-        fields=[
-            "region_country_code",
-            "valid_from",
-            "valid_until",
-            "intelica_id",
-            "fee_descriptor",
-            "fee_currency",
-            "fee_variable",
-            "fee_fixed",
-            "fee_min",
-            "fee_cap",
-            "business_mode",
-            "issuer_country",
-            "issuer_region",
-            "technology_indicator",
-            "product_id",
-            "fast_funds",
-            "travel_indicator",
-            "b2b_program_id",
-            "account_funding_source",
-            "nnss_indicator",
-            "product_subtype",
-            "transaction_code",
-            "transaction_code_qualifier",
-            "issuer_bin_8",
-            "acquirer_bin",
-            "acquirer_business_id",
-            "transaction_amount_currency",
-            "transaction_amount",
-            "acquirer_country",
-            "acquirer_region",
-            "merchant_country_code",
-            "merchant_country_region",
-            "merchant_category_code",
-            "requested_payment_service",
-            "usage_code",
-            "authorization_characteristics_indicator",
-            "authorization_code",
-            "pos_terminal_capability",
-            "cardholder_id_method",
-            "pos_entry_mode",
-            "timeliness",
-            "reimbursement_attribute",
-            "special_condition_indicator",
-            "fee_program_indicator",
-            "moto_eci_indicator",
-            "acceptance_terminal_indicator",
-            "prepaid_card_indicator",
-            "pos_environment_code",
-            "business_format_code",
-            "business_application_id",
-            "type_purchase",
-            "network_identification_code",
-            "message_reason_code",
-            "surcharge_amount",
-            "authorized_amount",
-            "authorization_response_code",
-            "merchant_verification_value",
-            "dynamic_currency_conversion_indicator",
-            "cvv2_result_code",
-            "national_tax_indicator",
-            "merchant_vat",
-            "summary_commodity",
-            "processing_code_transaction_type",
-            "point_of_service_condition_code",
-        ],
+        fields_alias=VISA_RULES_VIEW_FIELDS[type_record],
     )
-    int_cols = ["intelica_id"]
-    numeric_cols = ["fee_variable", "fee_fixed", "fee_min", "fee_cap"]
-    date_cols = ["valid_from", "valid_until"]
-    df[int_cols] = df[int_cols].apply(
-        pd.to_numeric, downcast="integer", errors="coerce"
-    )
-    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
-    for col in date_cols:
-        df[col] = pd.to_datetime(
-            df[col].str.slice(0, 10), format="%Y-%m-%d", errors="coerce"
-        ).dt.date
-    df[date_cols] = df[date_cols].fillna(date.today())
-    df_valid = df[(file_date >= df["valid_from"]) & (file_date <= df["valid_until"])]
-    df_valid = df_valid.sort_values(["region_country_code", "intelica_id"])
+    return view_name
+
+
+@lru_cache(maxsize=8)
+def _read_visa_rule_definitions(file_date: date, type_record: str) -> pd.DataFrame:
+    """
+    Read and cache Visa's interchange rule assignment criteria for a processing date.
+    """
     match type_record:
-        case "draft":
-            df_valid.drop(
-                columns=[
-                    "acquirer_country",
-                    "acquirer_region",
-                    "processing_code_transaction_type",
-                    "point_of_service_condition_code",
-                ],
-                inplace=True,
-            )
-            df_valid.rename(
-                columns={
-                    "account_funding_source": "funding_source",
-                    "acquirer_bin": "account_reference_number_acquiring_identifier",
-                    "cvv2_result_code": "cvv_result_code",
-                    "dynamic_currency_conversion_indicator": "dcc_indicator",
-                    "merchant_country_code": "jurisdiction_country",
-                    "merchant_country_region": "jurisdiction_region",
-                    "merchant_vat": "merchant_vat_registration_number",
-                    "moto_eci_indicator": "moto_ec_indicator",
-                    "national_tax_indicator": "national_tax_included",
-                    "pos_environment_code": "pos_environment",
-                    "pos_terminal_capability": "pos_terminal_capacity",
-                    "special_condition_indicator": "special_condition_indicator_merchant_draft_indicator",
-                    "summary_commodity": "summary_commodity_code",
-                    "transaction_amount": "source_amount",
-                    "transaction_code_qualifier": "draft_code_qualifier_0",
-                    "transaction_code": "draft_code",
-                    "type_purchase": "type_of_purchase",
-                },
-                inplace=True,
-            )
-            return df_valid
-        case "sms":
-            df_valid.drop(
-                columns=[
-                    "acquirer_country",
-                    "acquirer_region",
-                    "authorized_amount",
-                    "business_format_code",
-                    "merchant_vat",
-                    "national_tax_indicator",
-                    "prepaid_card_indicator",
-                    "summary_commodity",
-                    "transaction_amount_currency",
-                    "transaction_code_qualifier",
-                    "type_purchase",
-                ],
-                inplace=True,
-            )
-            df_valid.rename(
-                columns={
-                    "account_funding_source": "funding_source",
-                    "acceptance_terminal_indicator": "pos_terminal_type",
-                    "acquirer_business_id": "acquirer_business_id_sms",
-                    "authorization_characteristics_indicator": "authorization_characteristics_indicator_sms",
-                    "authorization_code": "authorization_code_valid",
-                    "authorization_response_code": "response_code",
-                    "business_application_id": "business_application_identifier",
-                    "cardholder_id_method": "customer_identification_method",
-                    "cvv2_result_code": "cvv_result_code_sms",
-                    "dynamic_currency_conversion_indicator": "dcc_indicator_sms",
-                    "fee_program_indicator": "fee_program_indicator_sms",
-                    "merchant_category_code": "merchant's_type",
-                    "merchant_country_code": "jurisdiction_country",
-                    "merchant_country_region": "jurisdiction_region",
-                    "merchant_verification_value": "mvv_code",
-                    "message_reason_code": "message_reason_code_sms",
-                    "moto_eci_indicator": "mail_telephone_or_electronic_commerce_indicator",
-                    "network_identification_code": "network_id",
-                    "point_of_service_condition_code": "pos_condition_code",
-                    "pos_environment_code": "recurring_payment_indicator_flag",
-                    "pos_entry_mode": "pos_entry_mode_sms",
-                    "pos_terminal_capability": "pos_terminal_entry_capability",
-                    "reimbursement_attribute": "reimbursement_attribute_sms",
-                    "special_condition_indicator": "chargeback_special_condition_merchant_indicator",
-                    "summary_commodity": "summary_commodity_code",
-                    "surcharge_amount": "surcharge_amount_sms",
-                    "transaction_amount": "source_amount",
-                    "transaction_code_qualifier": "draft_code_qualifier_0",
-                    "transaction_code": "transaction_code_sms",
-                    "usage_code": "usage_code_sms",
-                },
-                inplace=True,
-            )
-            return df_valid
+        case "draft" | "sms":
+            # Views expose the criteria under the record type's column names.
+            view_name = _create_visa_rules_view(type_record)
         case _:
             raise NotImplementedError
+    # Missing validity dates fall back to the current date, as when parsed below.
+    date_string = file_date.strftime("%Y-%m-%d")
+    df = _database().read_records(
+        table_name=view_name,
+        fields=None,
+        dtypes={
+            # Rules may be written with blank identifiers, which are read as missing.
+            "intelica_id": "Int32",
+            "fee_variable": "float64",
+            "fee_fixed": "float64",
+            "fee_min": "float64",
+            "fee_cap": "float64",
+        },
+        conditions=[
+            f"COALESCE(DATE(valid_from), DATE('now', 'localtime')) <= '{date_string}'",
+            f"COALESCE(DATE(valid_until), DATE('now', 'localtime')) >= '{date_string}'",
+        ],
+        # Rules without an identifier are evaluated last within their jurisdiction.
+        order_by=["region_country_code", "intelica_id IS NULL", "intelica_id"],
+    )
+    if df.empty:
+        raise ValueError(
+            f"No Visa {type_record} interchange rules found in '{view_name}' "
+            f"valid on {date_string}"
+        )
+    # Validity dates take few distinct values, so cached parsing is nearly free.
+    for col in ["valid_from", "valid_until"]:
+        df[col] = pd.to_datetime(
+            df[col], format="%Y-%m-%d", exact=False, cache=True, errors="coerce"
+        ).fillna(pd.Timestamp.today().normalize())
+    return df
 
 
 def _get_exchange_rates(file_date: date, brand: str) -> pd.DataFrame:
     """
     Get the exchange rates valid for the file's processing date and brand.
     """
+    return _read_exchange_rates(file_date, brand).copy()
+
+
+@lru_cache(maxsize=8)
+def _read_exchange_rates(file_date: date, brand: str) -> pd.DataFrame:
+    """
+    Read and cache the exchange rates valid for a processing date and brand.
+    """
     date_string = file_date.strftime("%Y-%m-%d")
-    db = Database()
-    df = db.read_records(
+    df = _database().read_records(
         table_name="exchange_rate",
         fields=[
             "currency_from",
@@ -232,68 +271,308 @@ def _get_exchange_rates(file_date: date, brand: str) -> pd.DataFrame:
     return df
 
 
-def _apply_condition_default(
+@dataclass(frozen=True)
+class _Fields:
+    """
+    Transaction fields referenced by rule conditions, stored as NumPy arrays.
+    """
+
+    arrays: dict[str, np.ndarray]
+    categories: dict[str, pd.Index]
+    rate_tables: dict[tuple[str, str], np.ndarray]
+
+
+@dataclass(frozen=True)
+class _ValueSet:
+    """
+    Values and inclusive integer ranges listed by a value condition.
+    """
+
+    values: np.ndarray
+    integers: np.ndarray
+    ranges: tuple[tuple[int, int], ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.values.size or self.ranges)
+
+    def codes(self, categories: pd.Index, numbers: np.ndarray) -> np.ndarray:
+        """
+        Return the codes of the categories that are in the set.
+        """
+        # Integer fields keep their native type and match integer values instead.
+        native = pd.api.types.is_integer_dtype(categories.dtype)
+        codes = categories.get_indexer(self.integers if native else self.values)
+        codes = codes[codes >= 0]
+        if self.ranges:
+            # Ranges are compared as numbers instead of listing every value in them.
+            in_ranges = np.zeros(len(categories), dtype=bool)
+            for low, high in self.ranges:
+                in_ranges |= (numbers >= low) & (numbers <= high)
+            codes = np.concatenate([codes, np.flatnonzero(in_ranges)])
+        return codes
+
+
+@dataclass(frozen=True)
+class _ValueCondition:
+    """
+    Condition on a field that must, or must not, take any of a list of values.
+    """
+
+    column: str
+    valid: _ValueSet
+    not_valid: _ValueSet
+    keep_spaces: bool
+
+    def lookup(self, categories: pd.Index, numbers: np.ndarray) -> np.ndarray:
+        """
+        Tabulate whether each category code of the field meets the condition.
+        """
+        # The trailing entry is taken by code -1 of missing values.
+        table = np.full(len(categories) + 1, not self.valid, dtype=bool)
+        if self.valid:
+            table[self.valid.codes(categories, numbers)] = True
+        if self.not_valid:
+            table[self.not_valid.codes(categories, numbers)] = False
+        return table
+
+
+@dataclass(frozen=True)
+class _LookupCondition:
+    """
+    Value condition specialised to the categories of a field as a lookup table.
+    """
+
+    column: str
+    table: np.ndarray
+
+    def apply(self, fields: _Fields, positions: np.ndarray) -> np.ndarray:
+        return self.table[fields.arrays[self.column][positions]]
+
+
+@dataclass(frozen=True)
+class _ComparisonCondition:
+    """
+    Condition on a numeric field compared against a value.
+    """
+
+    column: str
+    comparison: Callable[[np.ndarray, float], np.ndarray]
+    value: float
+
+    def apply(self, fields: _Fields, positions: np.ndarray) -> np.ndarray:
+        return self.compare(fields.arrays[self.column][positions])
+
+    def compare(self, values: np.ndarray) -> np.ndarray:
+        return self.comparison(values, self.value)
+
+
+@dataclass(frozen=True)
+class _RangeCondition:
+    """
+    Condition on a numeric field that must fall in an inclusive range.
+    """
+
+    column: str
+    low: float
+    high: float
+
+    def apply(self, fields: _Fields, positions: np.ndarray) -> np.ndarray:
+        return self.compare(fields.arrays[self.column][positions])
+
+    def compare(self, values: np.ndarray) -> np.ndarray:
+        return (values >= self.low) & (values <= self.high)
+
+
+@dataclass(frozen=True)
+class _AmountCurrencyCondition:
+    """
+    Condition on an amount converted to a target currency.
+    """
+
+    column: str
+    currency_column: str
+    target_currency: str
+    amount_condition: _ComparisonCondition | _RangeCondition
+
+    def apply(self, fields: _Fields, positions: np.ndarray) -> np.ndarray:
+        # Rates are tabulated by currency code, so converting is a single gather.
+        rate_table = fields.rate_tables[self.currency_column, self.target_currency]
+        rate_per_row = rate_table[fields.arrays[self.currency_column][positions]]
+        amounts = fields.arrays[self.column][positions]
+        return self.amount_condition.compare(amounts * rate_per_row)
+
+
+_Condition = (
+    _ValueCondition | _ComparisonCondition | _RangeCondition | _AmountCurrencyCondition
+)
+_SpecializedCondition = (
+    _LookupCondition | _ComparisonCondition | _RangeCondition | _AmountCurrencyCondition
+)
+
+
+def _normalize_values(field: pd.Series, keep_spaces: bool) -> pd.Series:
+    """
+    Normalise a field compared by value conditions into a categorical.
+    """
+    # Integer text never holds spaces or blanks, so integers skip the string cast.
+    if pd.api.types.is_integer_dtype(field.dtype):
+        return field.astype("category")
+    # Arrow-backed strings strip, compare and encode in Arrow kernels, not Python.
+    normalized = field.astype(str).astype("string[pyarrow]")
+    if not keep_spaces:
+        normalized = normalized.str.strip(_WHITESPACE)
+        normalized = normalized.mask(normalized.str.len() == 0, "BLANK")
+    return normalized.astype("category")
+
+
+def _rate_table(
+    rates: pd.DataFrame, currencies: pd.Index, target_currency: str
+) -> np.ndarray:
+    """
+    Tabulate exchange rates to a target currency by source currency category code.
+    """
+    target_rates = rates[rates["currency_to"] == target_currency]
+    rate_lookup = dict(
+        zip(target_rates["currency_from"], target_rates["exchange_value"])
+    )
+    # Amounts already in the target currency are compared as they are.
+    rate_lookup[target_currency] = 1.0
+    # The trailing missing rate is taken by code -1 of missing currencies.
+    return np.array(
+        [rate_lookup.get(currency, np.nan) for currency in currencies] + [np.nan],
+        dtype=float,
+    )
+
+
+def _condition_fields(
+    transactions: pd.DataFrame,
+    compiled_rules: list[list[_Condition]],
+    rates: pd.DataFrame,
+) -> _Fields:
+    """
+    Extract the transaction fields referenced by rule conditions as NumPy arrays.
+    """
+    arrays: dict[str, np.ndarray] = {}
+    categories: dict[str, pd.Index] = {}
+    rate_tables: dict[tuple[str, str], np.ndarray] = {}
+    for condition in (c for conditions in compiled_rules for c in conditions):
+        match condition:
+            case _ValueCondition(column=column) if column not in arrays:
+                # Normalise once, so rules only compare category codes.
+                values = _normalize_values(
+                    transactions[column], condition.keep_spaces
+                )
+                arrays[column] = values.cat.codes.to_numpy()
+                categories[column] = values.cat.categories
+            case _ComparisonCondition(column=column) | _RangeCondition(column=column):
+                arrays[column] = transactions[column].to_numpy(
+                    dtype=float, na_value=np.nan
+                )
+            case _AmountCurrencyCondition(currency_column=currency_column):
+                arrays[condition.column] = transactions[condition.column].to_numpy(
+                    dtype=float, na_value=np.nan
+                )
+                if currency_column not in arrays:
+                    currencies = transactions[currency_column].astype("category")
+                    arrays[currency_column] = currencies.cat.codes.to_numpy()
+                    categories[currency_column] = currencies.cat.categories
+                key = (currency_column, condition.target_currency)
+                if key not in rate_tables:
+                    rate_tables[key] = _rate_table(
+                        rates, categories[currency_column], condition.target_currency
+                    )
+    return _Fields(arrays, categories, rate_tables)
+
+
+def _parse_integers(values: Iterable[str]) -> np.ndarray:
+    """
+    Parse values that are exactly the text of an integer, leaving others missing.
+    """
+    return np.array(
+        [
+            float(int(value))
+            if value.isascii() and value.isdigit() and str(int(value)) == value
+            else np.nan
+            for value in values
+        ],
+        dtype=float,
+    )
+
+
+def _compile_value_set(values: list[str], ranges: list[tuple[int, int]]) -> _ValueSet:
+    """
+    Build the set of values and integer ranges listed by a value condition.
+    """
+    integers = _parse_integers(values)
+    return _ValueSet(
+        values=np.array(values, dtype=str),
+        integers=integers[~np.isnan(integers)].astype(np.int64),
+        ranges=tuple(ranges),
+    )
+
+
+def _compile_condition_default(
     condition_name: str,
     condition_value: str,
-    batch: pd.DataFrame,
     column_group_space: list[str],
-) -> pd.DataFrame:
+) -> _ValueCondition:
     """
-    Checks conditions that have a specific value.
+    Parse conditions that have a specific value.
     """
-    batch = batch.copy()
     condition_value = condition_value.strip().upper()
     condition_value = condition_value.replace("SPACE", " ")
     value_list = condition_value.split(",")
     valid_values = []
+    valid_ranges = []
     not_valid_values = []
+    not_valid_ranges = []
     for value in value_list:
         not_keyword_flag = False
         if "NOT:" in value:
             value = value.replace("NOT:", "")
             not_keyword_flag = True
-        filled_range = []
-        if "-" in value:
-            range_low, range_high = value.split("-", maxsplit=1)
-            filled_range = list(range(int(range_low), int(range_high) + 1))
-            filled_range = list(map(str, filled_range))
-        reformatted_values = filled_range or [value]
         match not_keyword_flag:
             case False:
-                valid_values.extend(reformatted_values)
+                values, ranges = valid_values, valid_ranges
             case True:
-                not_valid_values.extend(reformatted_values)
-
-    temp_col = batch[condition_name]
-    if condition_name in column_group_space:
-        batch["_normalized"] = temp_col.astype(str)
-    else:
-        temp_col = temp_col.astype(str).str.strip()
-        temp_col = temp_col.mask(temp_col.str.len() == 0, "BLANK")
-        batch["_normalized"] = temp_col
-
-    filter = batch
-    if valid_values:
-        filter = filter[filter["_normalized"].isin(valid_values)]
-    if not_valid_values:
-        filter = filter[~filter["_normalized"].isin(not_valid_values)]
-    filter = filter.drop(columns="_normalized")
-
-    return filter
+                values, ranges = not_valid_values, not_valid_ranges
+        if "-" in value:
+            range_low, range_high = value.split("-", maxsplit=1)
+            # An empty range is kept as a literal value.
+            if int(range_low) <= int(range_high):
+                ranges.append((int(range_low), int(range_high)))
+                continue
+        values.append(value)
+
+    return _ValueCondition(
+        column=condition_name,
+        valid=_compile_value_set(valid_values, valid_ranges),
+        not_valid=_compile_value_set(not_valid_values, not_valid_ranges),
+        keep_spaces=condition_name in column_group_space,
+    )
 
 
-def _apply_condition_greater_less(
-    condition_name: str, condition_value: str, batch: pd.DataFrame
-) -> pd.DataFrame:
+def _compile_condition_greater_less(
+    condition_name: str, condition_value: str, allow_equality: bool = True
+) -> _ComparisonCondition | _RangeCondition:
     """
-    Check numeric conditions where a value falls in a specified range.
+    Parse numeric conditions where a value falls in a specified range.
     """
+    comparison_operators = {
+        "<=": operator.le,
+        ">=": operator.ge,
+        "<": operator.lt,
+        ">": operator.gt,
+        "=": operator.eq,
+    }
     if any(x in condition_value for x in ["<", ">", "="]):
-        query_condition = f"{condition_name} " + condition_value.replace(
-            "<=", "<= "
-        ).replace(">=", ">= ").replace(">", "> ").replace("<", "< ")
-
-        filter = batch.query(query_condition)
+        comparison = _COMPARISON_PATTERN.fullmatch(condition_value)
+        if comparison is None:
+            raise ValueError
+        symbol, value = comparison.groups()
+        result = _ComparisonCondition(
+            condition_name, comparison_operators[symbol], float(value)
+        )
     elif any(x in condition_value for x in ["BETWEEN", "AND"]):
         range_low, range_high = list(
             map(
@@ -303,79 +582,45 @@ def _apply_condition_greater_less(
                 .split("AND", maxsplit=1),
             )
         )
-        filter = batch[
-            batch[condition_name]
-            .astype(float)
-            .between(range_low, range_high, inclusive="both")
-        ]
-    elif condition_value.replace(".", "", 1).isdigit():
+        result = _RangeCondition(condition_name, range_low, range_high)
+    elif allow_equality and condition_value.replace(".", "", 1).isdigit():
         numeric_value = float(condition_value)
-        filter = batch[batch[condition_name].astype(float) == numeric_value]
+        result = _RangeCondition(condition_name, numeric_value, numeric_value)
     else:
         raise ValueError
 
-    return filter
+    return result
 
 
-def _apply_condition_amount_currency(
-    condition_name: str, string_range: str, batch: pd.DataFrame, rates: pd.DataFrame
-) -> pd.DataFrame:
+def _compile_condition_amount_currency(
+    condition_name: str, string_range: str
+) -> _AmountCurrencyCondition:
     """
-    Check currency amount conditions where a value falls in a specified range.
+    Parse currency amount conditions where a value falls in a specified range.
     """
     condition_target_fields = {
         "source_amount": "source_currency_code_alphabetic",
     }
     target_currency, string_range = string_range.split(",", maxsplit=1)
-    target_rates = rates[rates["currency_to"] == target_currency]
-    filter = pd.merge(
-        left=batch,
-        right=target_rates[["currency_from", "exchange_value"]],
-        how="left",
-        left_on=condition_target_fields[condition_name],
-        right_on="currency_from",
+    return _AmountCurrencyCondition(
+        column=condition_name,
+        currency_column=condition_target_fields[condition_name],
+        target_currency=target_currency,
+        amount_condition=_compile_condition_greater_less(
+            "comparison_value", string_range, allow_equality=False
+        ),
     )
-    filter.loc[
-        filter[condition_target_fields[condition_name]] == target_currency,
-        "exchange_value",
-    ] = 1
-    filter["comparison_value"] = filter[condition_name] * filter["exchange_value"]
 
-    if any(x in string_range for x in ["<", ">", "="]):
-        query_condition = f"comparison_value " + string_range.replace(
-            "<=", "<= "
-        ).replace(">=", ">= ").replace(">", "> ").replace("<", "< ")
-
-        filter = filter.query(query_condition)
-    elif any(x in string_range for x in ["BETWEEN", "AND"]):
-        range_low, range_high = list(
-            map(
-                float,
-                string_range.replace(" ", "")
-                .replace("BETWEEN", "")
-                .split("AND", maxsplit=1),
-            )
-        )
-        filter = filter[
-            filter["comparison_value"].between(range_low, range_high, inclusive="both")
-        ]
-    else:
-        raise ValueError
 
-    return filter
-
-
-def _apply_condition(
-    condition_name: str, condition_value: str, batch: pd.DataFrame, rates: pd.DataFrame
-) -> pd.DataFrame:
+# Rules repeat the same condition texts, and files of a day share their rules.
+@lru_cache(maxsize=4096)
+def _compile_condition(condition_name: str, condition_value: str) -> _Condition | None:
     """
-    Clean, check and apply condition to a batch of transactions.
+    Clean and parse a rule condition, or return nothing if there is no condition.
     """
-    # If there is no condition, return the same batch of transactions.
     condition_value = condition_value.replace(" ", "").upper()
     if condition_value in ("", "NAN", "NONE"):
-        return batch
-    # Otherwise, evaluate the condition.
+        return None
     column_group_greater_less = [
         "surcharge_amount",
         "surcharge_amount_sms",
@@ -394,43 +639,22 @@ def _apply_condition(
 
     match condition_name:
         case name if name in column_group_greater_less:
-            result = _apply_condition_greater_less(
-                condition_name, condition_value, batch
-            )
+            result = _compile_condition_greater_less(condition_name, condition_value)
         case name if name in column_group_amount_currency:
-            result = _apply_condition_amount_currency(
-                condition_name, condition_value, batch, rates
-            )
+            result = _compile_condition_amount_currency(condition_name, condition_value)
         case _:
-            result = _apply_condition_default(
-                condition_name, condition_value, batch, column_group_space
+            result = _compile_condition_default(
+                condition_name, condition_value, column_group_space
             )
 
     return result
 
 
-def _evaluate_interchange_fees(
-    transactions: pd.DataFrame,
-    rules: pd.DataFrame,
-    rates: pd.DataFrame,
-) -> pd.DataFrame:
+def _compile_rules(rules: pd.DataFrame) -> list[list[_Condition]]:
     """
-    Evaluate interchange fee criteria for a dataset of transactions.
+    Parse the conditions of every rule definition once, ahead of their evaluation.
     """
-    # Filter rule definitions to only jurisdictions present in data.
-    jurisdiction_list = transactions["jurisdiction_assigned"].unique()
-    rules_to_evaluate = rules[rules["region_country_code"].isin(jurisdiction_list)]
-    # Initialize rule identifier fields.
-    transactions["interchange_region_country_code"] = ""
-    transactions["interchange_intelica_id"] = -1
-    transactions["interchange_fee_descriptor"] = ""
-    transactions["interchange_fee_currency"] = ""
-    transactions["interchange_fee_variable"] = 0.0
-    transactions["interchange_fee_fixed"] = 0.0
-    transactions["interchange_fee_min"] = 0.0
-    transactions["interchange_fee_cap"] = 0.0
-    # Iterate through each rule definition.
-    conditions_to_skip = [
+    conditions_to_skip = {
         "region_country_code",
         "valid_from",
         "valid_until",
@@ -441,49 +665,134 @@ def _evaluate_interchange_fees(
         "fee_fixed",
         "fee_min",
         "fee_cap",
-    ]
-    update_columns = [
-        "region_country_code",
-        "intelica_id",
-        "fee_descriptor",
-        "fee_currency",
-        "fee_variable",
-        "fee_fixed",
-        "fee_min",
-        "fee_cap",
-    ]
-    for _, rule in rules_to_evaluate.iterrows():
-        # Step 1: Filter unprocessed transactions and decide to break, skip or evaluate.
-        next_batch = transactions[
-            (transactions["interchange_intelica_id"] == -1)
-            & (transactions["jurisdiction_assigned"] == rule["region_country_code"])
-        ]
-        if next_batch.empty:
-            continue
-        # Step 2: Iterate through each condition in the rule and apply its condition.
-        conditions = [
-            str(cond_name)
-            for cond_name in rule.index.to_list()
-            if cond_name not in conditions_to_skip and rule[cond_name] != ""
-        ]
+    }
+    condition_columns = [c for c in rules.columns if c not in conditions_to_skip]
+    # Most rules fill only a few conditions, so visit just their filled cells.
+    values = rules[condition_columns].to_numpy()
+    compiled_rules: list[list[_Condition]] = [[] for _ in range(len(rules))]
+    for position, column in zip(*np.nonzero(values != "")):
+        condition = _compile_condition(
+            condition_columns[column], values[position, column]
+        )
+        if condition is not None:
+            compiled_rules[position].append(condition)
+    return compiled_rules
+
+
+def _category_numbers(categories: pd.Index) -> np.ndarray:
+    """
+    Return the integer value of each category of a field, missing if it has none.
+    """
+    if pd.api.types.is_integer_dtype(categories.dtype):
+        return categories.to_numpy(dtype=float, na_value=np.nan)
+    return _parse_integers(categories)
+
+
+def _specialize_rules(
+    compiled_rules: list[list[_Condition]], fields: _Fields
+) -> list[list[_SpecializedCondition]]:
+    """
+    Specialise the value conditions of every rule to the categories of a file.
+    """
+    numbers: dict[str, np.ndarray] = {}
+    # Compiled conditions are shared by rules with the same condition text.
+    lookups: dict[int, _LookupCondition] = {}
+    specialized_rules: list[list[_SpecializedCondition]] = []
+    for conditions in compiled_rules:
+        specialized: list[_SpecializedCondition] = []
         for condition in conditions:
-            next_batch = _apply_condition(condition, rule[condition], next_batch, rates)
-            if next_batch.empty:
-                break
-        # Step 3: Update transaction table with batch results.
-        if not next_batch.empty:
-            for column in update_columns:
-                next_batch.loc[:, f"interchange_{column}"] = rule[column]
-            transactions.update(
-                next_batch[[f"interchange_{c}" for c in update_columns]]
-            )
+            if not isinstance(condition, _ValueCondition):
+                specialized.append(condition)
+                continue
+            if id(condition) not in lookups:
+                column = condition.column
+                categories = fields.categories[column]
+                if column not in numbers:
+                    numbers[column] = _category_numbers(categories)
+                lookups[id(condition)] = _LookupCondition(
+                    column, condition.lookup(categories, numbers[column])
+                )
+            specialized.append(lookups[id(condition)])
+        specialized_rules.append(specialized)
+    return specialized_rules
 
-    columns_to_return = [f"interchange_{c}" for c in update_columns]
-    columns_to_return = [
-        "source_currency_code_alphabetic",
-        "source_amount",
-    ] + columns_to_return
-    return transactions[columns_to_return]
+
+def _evaluate_interchange_fees(
+    transactions: pd.DataFrame,
+    rules: pd.DataFrame,
+    rates: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Evaluate interchange fee criteria for a dataset of transactions.
+    """
+    # Filter rule definitions to only jurisdictions present in data.
+    jurisdiction_list = transactions["jurisdiction_assigned"].unique()
+    rules_to_evaluate = rules[rules["region_country_code"].isin(jurisdiction_list)]
+    # Default rule identifier fields of transactions that match no rule.
+    unassigned_fields = {
+        "region_country_code": "",
+        "intelica_id": -1,
+        "fee_descriptor": "",
+        "fee_currency": "",
+        "fee_variable": 0.0,
+        "fee_fixed": 0.0,
+        "fee_min": 0.0,
+        "fee_cap": 0.0,
+    }
+    update_columns = list(unassigned_fields)
+    # Missing fee parameters leave the initial fee values untouched.
+    fee_columns = ["fee_variable", "fee_fixed", "fee_min", "fee_cap"]
+    rules_to_evaluate = rules_to_evaluate.fillna({c: 0.0 for c in fee_columns})
+    rules_to_evaluate = rules_to_evaluate.reset_index(drop=True)
+    # Parse every rule's conditions once, before any of them is evaluated.
+    compiled_rules = _compile_rules(rules_to_evaluate)
+    # Read the fields used by conditions once, as arrays shared by every rule.
+    fields = _condition_fields(transactions, compiled_rules, rates)
+    # Resolve value conditions against the file's categories into lookup tables.
+    specialized_rules = _specialize_rules(compiled_rules, fields)
+    # Positions of each jurisdiction's transactions, grouped once for all rules.
+    jurisdiction_indices = transactions.groupby("jurisdiction_assigned").indices
+    # Position of the first rule matched by each transaction, -1 while unassigned.
+    matched_rules = np.full(len(transactions), -1, dtype=np.int64)
+    # Rules without an identifier leave transactions open to the next rules.
+    assigning_rules = np.append(rules_to_evaluate["intelica_id"].notna(), False)
+    for region, region_rules in rules_to_evaluate.groupby(
+        "region_country_code", sort=False
+    ):
+        # Step 1: Start from the positions of the jurisdiction's transactions.
+        unassigned = jurisdiction_indices.get(region)
+        if unassigned is None:
+            continue
+        for position in region_rules.index:
+            # Step 2: Skip the jurisdiction once all of its transactions are assigned.
+            if not unassigned.size:
+                break
+            # Step 3: Narrow the positions down by each condition in the rule.
+            matches = unassigned
+            for condition in specialized_rules[position]:
+                matches = matches[condition.apply(fields, matches)]
+                if not matches.size:
+                    break
+            # Step 4: Record the rule for matching transactions that are unassigned.
+            if matches.size:
+                matched_rules[matches] = position
+                if assigning_rules[position]:
+                    assigned = assigning_rules[matched_rules[unassigned]]
+                    unassigned = unassigned[~assigned]
+    # Gather rule fields once; position -1 takes the trailing row of defaults.
+    rule_fields = pd.concat(
+        [rules_to_evaluate[update_columns], pd.DataFrame([unassigned_fields])],
+        ignore_index=True,
+    ).take(matched_rules)
+    # Only the returned frame receives the results, leaving transactions untouched.
+    result = transactions[["source_currency_code_alphabetic", "source_amount"]].copy()
+    for column in update_columns:
+        result[f"interchange_{column}"] = rule_fields[column].array
+    # Rule identifiers are read as nullable 32-bit integers, so they are written so.
+    result["interchange_intelica_id"] = (
+        result["interchange_intelica_id"].fillna(-1).astype("Int32")
+    )
+    return result
 
 
 def _calculate_interchange_fees(
@@ -533,6 +842,69 @@ def _calculate_interchange_fees(
     return result
 
 
+def _read_interchange_inputs(
+    origin_layer: FileStorage.Layer,
+    client_id: str,
+    file_id: str,
+    transactions_subdir: str,
+    calculated_subdir: str,
+    type_record: str,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Read transactions, calculated fields, rule definitions and rates concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        log.logger.info(f"Reading clean Transactions from {client_id} file {file_id}")
+        pending_transactions = executor.submit(
+            fs.read_parquet,
+            origin_layer,
+            client_id,
+            file_id,
+            subdir=transactions_subdir,
+        )
+        log.logger.info(
+            f"Reading calculated field data from {client_id} file {file_id}"
+        )
+        pending_calculated = executor.submit(
+            fs.read_parquet,
+            origin_layer,
+            client_id,
+            file_id,
+            subdir=calculated_subdir,
+        )
+        # Rules and rates depend on the file date, fetched while parquet is read.
+        file_date = _get_file_data(client_id, file_id)["file_processing_date"]
+        log.logger.info(f"Reading visa rule definitions for {client_id} file {file_id}")
+        pending_rules = executor.submit(
+            _get_visa_rule_definitions, file_date, type_record=type_record
+        )
+        log.logger.info(f"Reading exchange rate data for {client_id} file {file_id}")
+        pending_rates = executor.submit(_get_exchange_rates, file_date, brand="VISA")
+        return (
+            pending_transactions.result(),
+            pending_calculated.result(),
+            pending_rules.result(),
+            pending_rates.result(),
+        )
+
+
+def _merge_calculated_fields(
+    transactions: pd.DataFrame, calculated: pd.DataFrame, suffix: str
+) -> pd.DataFrame:
+    """
+    Join calculated fields to transactions, suffixing overlapping transaction fields.
+    """
+    aligned = transactions.index.is_unique and transactions.index.equals(
+        calculated.index
+    )
+    if not aligned:
+        return transactions.join(calculated, how="left", lsuffix=suffix)
+    # Both layers hold the same records in the same order, so no lookup is needed.
+    overlap = transactions.columns.intersection(calculated.columns)
+    transactions = transactions.rename(columns={c: f"{c}{suffix}" for c in overlap})
+    return pd.concat([transactions, calculated.set_axis(transactions.index)], axis=1)
+
+
 def calculate_baseii_interchange(
     origin_layer: FileStorage.Layer,
     target_layer: FileStorage.Layer,
@@ -545,35 +917,18 @@ def calculate_baseii_interchange(
     """
     Calculate interchange fee fields for BASE II transaction data.
     """
-    log.logger.info(
-        f"Reading clean BASE II Transactions from {client_id} file {file_id}"
-    )
-    transactions = fs.read_parquet(
-        origin_layer,
-        client_id,
-        file_id,
-        subdir=transactions_subdir,
-    )
-    log.logger.info(f"Reading calculated field data from {client_id} file {file_id}")
-    calculated = fs.read_parquet(
+    transactions, calculated, rules_data, rates = _read_interchange_inputs(
         origin_layer,
         client_id,
         file_id,
-        subdir=calculated_subdir,
+        transactions_subdir,
+        calculated_subdir,
+        type_record="draft",
     )
     log.logger.info(
         f"Merging transactional and calculated data from {client_id} file {file_id}"
     )
-    merged_data = transactions.join(calculated, how="left", lsuffix="_baseii")
-
-    log.logger.info(f"Reading visa rule definitions for {client_id} file {file_id}")
-    file_data = _get_file_data(client_id, file_id)
-    rules_data = _get_visa_rule_definitions(
-        file_data["file_processing_date"], type_record="draft"
-    )
-
-    log.logger.info(f"Reading exchange rate data for {client_id} file {file_id}")
-    rates = _get_exchange_rates(file_data["file_processing_date"], brand="VISA")
+    merged_data = _merge_calculated_fields(transactions, calculated, suffix="_baseii")
 
     log.logger.info(f"Evaluating fee criteria for {client_id} file {file_id}")
     fee_parameters = _evaluate_interchange_fees(merged_data, rules_data, rates)
@@ -583,7 +938,12 @@ def calculate_baseii_interchange(
 
     log.logger.info(f"Saving Visa interchange fields for {client_id} file {file_id}")
     fs.write_parquet(
-        interchange_df, target_layer, client_id, file_id, subdir=target_subdir
+        interchange_df,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
     )
 
 
@@ -599,33 +959,18 @@ def calculate_sms_interchange(
     """
     Calculate interchange fee fields for SMS transaction data.
     """
-    log.logger.info(f"Reading clean SMS Transactions from {client_id} file {file_id}")
-    transactions = fs.read_parquet(
+    transactions, calculated, rules_data, rates = _read_interchange_inputs(
         origin_layer,
         client_id,
         file_id,
-        subdir=transactions_subdir,
-    )
-    log.logger.info(f"Reading calculated field data from {client_id} file {file_id}")
-    calculated = fs.read_parquet(
-        origin_layer,
-        client_id,
-        file_id,
-        subdir=calculated_subdir,
+        transactions_subdir,
+        calculated_subdir,
+        type_record="sms",
     )
     log.logger.info(
         f"Merging transactional and calculated data from {client_id} file {file_id}"
     )
-    merged_data = transactions.join(calculated, how="left", lsuffix="_sms")
-
-    log.logger.info(f"Reading visa rule definitions for {client_id} file {file_id}")
-    file_data = _get_file_data(client_id, file_id)
-    rules_data = _get_visa_rule_definitions(
-        file_data["file_processing_date"], type_record="sms"
-    )
-
-    log.logger.info(f"Reading exchange rate data for {client_id} file {file_id}")
-    rates = _get_exchange_rates(file_data["file_processing_date"], brand="VISA")
+    merged_data = _merge_calculated_fields(transactions, calculated, suffix="_sms")
 
     log.logger.info(f"Evaluating fee criteria for {client_id} file {file_id}")
     fee_parameters = _evaluate_interchange_fees(merged_data, rules_data, rates)
@@ -635,5 +980,10 @@ def calculate_sms_interchange(
 
     log.logger.info(f"Saving Visa interchange fields for {client_id} file {file_id}")
     fs.write_parquet(
-        interchange_df, target_layer, client_id, file_id, subdir=target_subdir
+        interchange_df,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
     )
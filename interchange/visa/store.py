@@ -1,3 +1,9 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
 from interchange.logs.logger import Logger
 from interchange.persistence.file import FileStorage
 
@@ -5,6 +11,124 @@ from interchange.persistence.file import FileStorage
 log = Logger(__name__)
 fs = FileStorage()
 
+# Stored files are read downstream, so favour size with zstd and dictionaries.
+PARQUET_OPTIONS = {
+    "row_group_size": 1_000_000,
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+}
+
+
+def _record_index(table: pa.Table, metadata: dict) -> pd.Index | None:
+    """
+    Return the index stored in a table, or nothing if it is not a single index.
+    """
+    if len(metadata["index_columns"]) != 1:
+        return None
+    index = metadata["index_columns"][0]
+    if isinstance(index, dict):
+        # Range indexes are stored as metadata rather than as a column.
+        return pd.RangeIndex(index["start"], index["stop"], index["step"])
+    return pd.Index(table.column(index).to_numpy())
+
+
+def _join_aligned_tables(
+    left: pa.Table, right: pa.Table, lsuffix: str, rsuffix: str
+) -> pa.Table | None:
+    """
+    Combine the columns of two tables of the same records in the same order.
+    Returns nothing when the records are not aligned.
+    """
+    left_metadata = left.schema.pandas_metadata
+    right_metadata = right.schema.pandas_metadata
+    if left_metadata is None or right_metadata is None:
+        return None
+    left_index = _record_index(left, left_metadata)
+    right_index = _record_index(right, right_metadata)
+    if left_index is None or right_index is None:
+        return None
+    if not (left_index.is_unique and left_index.equals(right_index)):
+        return None
+    index_fields = [n for n in left_metadata["index_columns"] if isinstance(n, str)]
+    # Tables read with a column projection keep metadata of every stored column.
+    left_columns, right_columns = (
+        [
+            c
+            for c in m["columns"]
+            if c["field_name"] not in m["index_columns"]
+            and c["field_name"] in t.column_names
+        ]
+        for t, m in ((left, left_metadata), (right, right_metadata))
+    )
+    overlap = {c["name"] for c in left_columns} & {c["name"] for c in right_columns}
+    if overlap and not (lsuffix or rsuffix):
+        return None
+
+    def renamed(column: dict, suffix: str) -> dict:
+        if column["name"] not in overlap:
+            return column
+        name = f"{column['name']}{suffix}"
+        return {**column, "name": name, "field_name": name}
+
+    arrays = (
+        [left.column(c["field_name"]) for c in left_columns]
+        + [right.column(c["field_name"]) for c in right_columns]
+        + [left.column(name) for name in index_fields]
+    )
+    columns = [renamed(c, lsuffix) for c in left_columns] + [
+        renamed(c, rsuffix) for c in right_columns
+    ]
+    index_columns = [
+        c for c in left_metadata["columns"] if c["field_name"] in index_fields
+    ]
+    metadata = {**left_metadata, "columns": columns + index_columns}
+    return pa.Table.from_arrays(
+        arrays,
+        names=[c["field_name"] for c in columns] + index_fields,
+        metadata={b"pandas": json.dumps(metadata).encode()},
+    )
+
+
+def _join_fields(
+    left: pa.Table, right: pa.Table, lsuffix: str = "", rsuffix: str = ""
+) -> pa.Table:
+    """
+    Left join the fields of two tables of records on their index.
+    """
+    # Layers of a file usually hold the same records in the same order.
+    joined = _join_aligned_tables(left, right, lsuffix, rsuffix)
+    if joined is not None:
+        return joined
+    merged_data = left.to_pandas().join(
+        right.to_pandas(), how="left", lsuffix=lsuffix, rsuffix=rsuffix
+    )
+    return pa.Table.from_pandas(merged_data, preserve_index=True)
+
+
+def _read_layers(
+    origin_layer: FileStorage.Layer,
+    client_id: str,
+    file_id: str,
+    subdirs: list[str],
+    columns: list[list[str] | None],
+) -> list[pa.Table]:
+    """
+    Read the tables of a file stored in several subdirectories concurrently.
+    Each table is read with only its given columns, or every column if none.
+    """
+    # Reads are independent and mostly wait on storage, so they overlap in threads.
+    with ThreadPoolExecutor(max_workers=max(len(subdirs), 1)) as executor:
+        return list(
+            executor.map(
+                lambda subdir, cols: fs.read_parquet_table(
+                    origin_layer, client_id, file_id, subdir=subdir, columns=cols
+                ),
+                subdirs,
+                columns,
+            )
+        )
+
 
 def store_baseii_file(
     origin_layer: FileStorage.Layer,
@@ -15,39 +139,36 @@ def store_baseii_file(
     calculated_subdir="400-BASEII_CAL_DRAFTS",
     interchange_subdir="500-BASEII_ITX_DRAFTS",
     target_subdir="BASEII_DRAFTS",
+    transactions_cols: list[str] | None = None,
+    calculated_cols: list[str] | None = None,
+    interchange_cols: list[str] | None = None,
 ) -> None:
     """
     Store a fully processed BASE II file.
+    Only the given columns of each layer are read, or every column if none.
     """
     log.logger.info(
-        f"Reading clean BASE II Transactions from {client_id} file {file_id}"
-    )
-    transactions = fs.read_parquet(
-        origin_layer,
-        client_id,
-        file_id,
-        subdir=transactions_subdir,
-    )
-    log.logger.info(f"Reading calculated field data from {client_id} file {file_id}")
-    calculated = fs.read_parquet(
-        origin_layer,
-        client_id,
-        file_id,
-        subdir=calculated_subdir,
+        f"Reading clean BASE II Transactions, calculated field and interchange data "
+        f"from {client_id} file {file_id}"
     )
-    log.logger.info(f"Reading interchange data from {client_id} file {file_id}")
-    interchange = fs.read_parquet(
+    transactions, calculated, interchange = _read_layers(
         origin_layer,
         client_id,
         file_id,
-        subdir=interchange_subdir,
+        [transactions_subdir, calculated_subdir, interchange_subdir],
+        [transactions_cols, calculated_cols, interchange_cols],
     )
     log.logger.info(f"Merging full BASE II data from {client_id} file {file_id}")
-    merged_data = transactions.join(calculated, how="left", lsuffix="_baseii")
-    merged_data = merged_data.join(interchange, how="left", rsuffix="_intelica")
+    merged_data = _join_fields(transactions, calculated, lsuffix="_baseii")
+    merged_data = _join_fields(merged_data, interchange, rsuffix="_intelica")
     log.logger.info(f"Saving full BASE II for {client_id} file {file_id}")
-    fs.write_parquet(
-        merged_data, target_layer, client_id, file_id, subdir=target_subdir
+    fs.write_parquet_table(
+        merged_data,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
     )
 
 
@@ -60,37 +181,75 @@ def store_sms_file(
     calculated_subdir="400-SMS_CAL_MESSAGES",
     interchange_subdir="500-SMS_ITX_MESSAGES",
     target_subdir="SMS_MESSAGES",
+    transactions_cols: list[str] | None = None,
+    calculated_cols: list[str] | None = None,
+    interchange_cols: list[str] | None = None,
 ) -> None:
     """
     Store a fully processed SMS file.
+    Only the given columns of each layer are read, or every column if none.
     """
-    log.logger.info(f"Reading clean SMS Transactions from {client_id} file {file_id}")
-    transactions = fs.read_parquet(
+    log.logger.info(
+        f"Reading clean SMS Transactions, calculated field and interchange data "
+        f"from {client_id} file {file_id}"
+    )
+    transactions, calculated, interchange = _read_layers(
         origin_layer,
         client_id,
         file_id,
-        subdir=transactions_subdir,
+        [transactions_subdir, calculated_subdir, interchange_subdir],
+        [transactions_cols, calculated_cols, interchange_cols],
     )
-    log.logger.info(f"Reading calculated field data from {client_id} file {file_id}")
-    calculated = fs.read_parquet(
-        origin_layer,
+    log.logger.info(f"Merging full SMS data from {client_id} file {file_id}")
+    merged_data = _join_fields(transactions, calculated, lsuffix="_baseii")
+    merged_data = _join_fields(merged_data, interchange, rsuffix="_intelica")
+    log.logger.info(f"Saving full SMS for {client_id} file {file_id}")
+    fs.write_parquet_table(
+        merged_data,
+        target_layer,
         client_id,
         file_id,
-        subdir=calculated_subdir,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
+
+
+def _store_vss_type(
+    origin_layer: FileStorage.Layer,
+    target_layer: FileStorage.Layer,
+    client_id: str,
+    file_id: str,
+    vss_type: str,
+    transactions_subdir: str,
+    calculated_subdir: str,
+    target_subdir: str,
+    transactions_cols: list[str] | None = None,
+    calculated_cols: list[str] | None = None,
+) -> None:
+    """
+    Store a single processed VSS variant.
+    """
+    log.logger.info(
+        f"Reading clean VSS {vss_type} records and calculated field data "
+        f"from {client_id} file {file_id}"
     )
-    log.logger.info(f"Reading interchange data from {client_id} file {file_id}")
-    interchange = fs.read_parquet(
+    transactions, calculated = _read_layers(
         origin_layer,
         client_id,
         file_id,
-        subdir=interchange_subdir,
+        [transactions_subdir, calculated_subdir],
+        [transactions_cols, calculated_cols],
     )
-    log.logger.info(f"Merging full SMS data from {client_id} file {file_id}")
-    merged_data = transactions.join(calculated, how="left", lsuffix="_baseii")
-    merged_data = merged_data.join(interchange, how="left", rsuffix="_intelica")
-    log.logger.info(f"Saving full SMS for {client_id} file {file_id}")
-    fs.write_parquet(
-        merged_data, target_layer, client_id, file_id, subdir=target_subdir
+    log.logger.info(f"Merging VSS {vss_type} data from {client_id} file {file_id}")
+    merged_data = _join_fields(transactions, calculated, lsuffix="_vss")
+    log.logger.info(f"Saving VSS {vss_type} data for {client_id} file {file_id}")
+    fs.write_parquet_table(
+        merged_data,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
     )
 
 
@@ -103,6 +262,8 @@ def store_vss_file(
     transactions_subdir_template: str = None,
     calculated_subdir_template: str = None,
     target_subdir_template: str = None,
+    transactions_cols: list[str] | None = None,
+    calculated_cols: list[str] | None = None,
 ) -> None:
     """
     Store processed VSS settlement files.
@@ -122,6 +283,8 @@ def store_vss_file(
                                    Default: "400-BASEII_CAL_VSS_{vss_type}"
         target_subdir_template: Template for output subdirs.
                                Default: "BASEII_VSS_{vss_type}"
+        transactions_cols: Columns of clean data to read. Default: every column
+        calculated_cols: Columns of calculated data to read. Default: every column
     """
     if vss_types is None:
         vss_types = ["110", "120", "130", "140"]
@@ -136,36 +299,27 @@ def store_vss_file(
     
     log.logger.info(f"Storing VSS variants: {', '.join(vss_types)}")
     
-    for vss_type in vss_types:
-        try:
-            transactions_subdir = transactions_subdir_template.format(vss_type=vss_type)
-            calculated_subdir = calculated_subdir_template.format(vss_type=vss_type)
-            target_subdir = target_subdir_template.format(vss_type=vss_type)
-            
-            log.logger.info(f"Reading clean VSS {vss_type} records from {client_id} file {file_id}")
-            transactions = fs.read_parquet(
-                origin_layer,
-                client_id,
-                file_id,
-                subdir=transactions_subdir,
-            )
-            
-            log.logger.info(f"Reading calculated field data for VSS {vss_type} from {client_id} file {file_id}")
-            calculated = fs.read_parquet(
+    # Each variant reads and writes its own files, so they are stored concurrently.
+    with ThreadPoolExecutor(max_workers=max(len(vss_types), 1)) as executor:
+        futures = {
+            vss_type: executor.submit(
+                _store_vss_type,
                 origin_layer,
+                target_layer,
                 client_id,
                 file_id,
-                subdir=calculated_subdir,
-            )
-            
-            log.logger.info(f"Merging VSS {vss_type} data from {client_id} file {file_id}")
-            merged_data = transactions.join(calculated, how="left", lsuffix="_vss")
-            
-            log.logger.info(f"Saving VSS {vss_type} data for {client_id} file {file_id}")
-            fs.write_parquet(
-                merged_data, target_layer, client_id, file_id, subdir=target_subdir
+                vss_type,
+                transactions_subdir_template.format(vss_type=vss_type),
+                calculated_subdir_template.format(vss_type=vss_type),
+                target_subdir_template.format(vss_type=vss_type),
+                transactions_cols,
+                calculated_cols,
             )
-            
-        except Exception as e:
-            log.logger.error(f"Error storing VSS {vss_type}: {str(e)}")
-            raise
+            for vss_type in vss_types
+        }
+        for vss_type, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log.logger.error(f"Error storing VSS {vss_type}: {str(e)}")
+                raise
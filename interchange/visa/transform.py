@@ -1,43 +1,51 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
 
 from interchange.logs.logger import Logger
 from interchange.persistence.file import FileStorage
+from interchange.visa._ctf import load_ctf_bytes, pivot_groups_on_key, pivot_on_key
 
 
 log = Logger(__name__)
 fs = FileStorage()
 
-
-def _load_as_ctf(
-    layer: FileStorage.Layer, client_id: str, file_id: str, subdir=""
-) -> pd.Series:
-    """
-    Load a Visa interchange file into memory forcing the CTF line format.
-    """
-    records = fs.read_plaintext(fs.Layer.LANDING, client_id, file_id, subdir=subdir)
-    header_record = str(records.iloc[0, 0])
-    if len(header_record) == 168:
-        return records["lines"]
-    if len(header_record) == 170:
-        return records["lines"].str.slice(stop=2) + records["lines"].str.slice(start=4)
-    log.logger.error("The Visa interchange file has an unknown line length")
-    return pd.Series([], name="lines")
-
-
-def _pivot_values_on_key(values: pd.Series, start: int, stop: int, cols: list[str]):
-    """
-    Pivot a series of values into records by a sorted numerical key in values.
-    """
-    values_df = values.to_frame(name="value")
-    values_df["key"] = values_df["value"].str.slice(start=start, stop=stop).astype(int)
-    values_df["record"] = (values_df["key"] <= values_df["key"].shift(1)).cumsum()
-    values_df["key"] = values_df["key"].astype(str)
-    return (
-        values_df.pivot(index="record", columns="key", values="value")
-        .reindex(columns=cols)
-        .fillna("")
-        .astype(str)
-    )
+# Raw lines repeat record layouts and codes, which zstd compresses well.
+PARQUET_OPTIONS = {
+    "row_group_size": 1_000_000,
+    "compression": "zstd",
+    "compression_level": 3,
+    "use_dictionary": True,
+}
+# Codes of the lines kept by each transform; codes used as key columns keep order.
+BASEII_VALID_TC = frozenset({"05", "06", "07", "25", "26", "27"})
+BASEII_VALID_TCSN = ("0", "1", "2", "3", "4", "5", "6", "7")
+SMS_VALID_TC = frozenset({"33"})
+SMS_VALID_TCSN = frozenset({"0"})
+SMS_VALID_TYPES = frozenset({"SMSRAWDATA"})
+SMS_VALID_RAW_DATA_VERSION = frozenset({"V22"})
+SMS_VALID_RECORD_TYPES = (
+    # "22000",
+    "22200",
+    "22210",
+    "22220",
+    "22225",
+    "22226",
+    "22230",
+    "22250",
+    "22260",
+    "22261",
+    "22280",
+    "22281",
+    "22282",
+)
+VSS_VALID_TC = frozenset({"46"})
+VSS_VALID_TCSN = ("0", "1")
+VSS_VALID_TYPES = ("110", "120", "130", "140")
+# VSS variants are read from the TCSN 0 line: the type, then a blank suffix.
+VSS_TYPE_START = 60
+VSS_SUFFIX_END = 65
+VSS_SUFFIX_VALUE = "  "
 
 
 def transform_baseii_drafts(
@@ -51,18 +59,25 @@ def transform_baseii_drafts(
     """
     Reorganize drafts into individual records of raw transaction data.
     """
-    VALID_TC = ["05", "06", "07", "25", "26", "27"]
-    VALID_TCSN = ["0", "1", "2", "3", "4", "5", "6", "7"]
     log.logger.info(f"Opening {client_id} file {file_id} as CTF")
-    ctf_records = _load_as_ctf(origin_layer, client_id, file_id, subdir=origin_subdir)
+    ctf_records = load_ctf_bytes(origin_layer, client_id, file_id, subdir=origin_subdir)
     log.logger.info(f"Extracting Raw BASE II Drafts from {client_id} file {file_id}")
-    drafts = ctf_records[
-        ctf_records.str.slice(stop=2).isin(VALID_TC)
-        & ctf_records.str.slice(start=3, stop=4).isin(VALID_TCSN)
-    ]
-    drafts_df = _pivot_values_on_key(drafts, start=3, stop=4, cols=VALID_TCSN)
+    drafts = pivot_on_key(
+        ctf_records,
+        start=3,
+        stop=4,
+        cols=BASEII_VALID_TCSN,
+        filters=[(0, 2, BASEII_VALID_TC), (3, 4, BASEII_VALID_TCSN)],
+    )
     log.logger.info(f"Saving Raw BASE II Transactions from {client_id} file {file_id}")
-    fs.write_parquet(drafts_df, target_layer, client_id, file_id, subdir=target_subdir)
+    fs.write_parquet_table(
+        drafts,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
 
 
 def transform_sms_messages(
@@ -76,37 +91,60 @@ def transform_sms_messages(
     """
     Reorganize messages into individual records of raw transaction data.
     """
-    VALID_TC = ["33"]
-    VALID_TCSN = ["0"]
-    VALID_SMS_TYPES = ["SMSRAWDATA"]
-    VALID_RAW_DATA_VERSION = ["V22"]
-    VALID_RECORD_TYPES = [
-        # "22000",
-        "22200",
-        "22210",
-        "22220",
-        "22225",
-        "22226",
-        "22230",
-        "22250",
-        "22260",
-        "22261",
-        "22280",
-        "22281",
-        "22282",
-    ]
     log.logger.info(f"Opening {client_id} file {file_id} as CTF")
-    ctf_records = _load_as_ctf(origin_layer, client_id, file_id, subdir=origin_subdir)
+    ctf_records = load_ctf_bytes(origin_layer, client_id, file_id, subdir=origin_subdir)
     log.logger.info(f"Extracting Raw SMS Messages from {client_id} file {file_id}")
-    drafts = ctf_records[
-        ctf_records.str.slice(stop=2).isin(VALID_TC)
-        & ctf_records.str.slice(start=3, stop=4).isin(VALID_TCSN)
-        & ctf_records.str.slice(start=16, stop=26).isin(VALID_SMS_TYPES)
-        & ctf_records.str.slice(start=34, stop=37).isin(VALID_RAW_DATA_VERSION)
-    ]
-    drafts_df = _pivot_values_on_key(drafts, start=35, stop=40, cols=VALID_RECORD_TYPES)
+    drafts = pivot_on_key(
+        ctf_records,
+        start=35,
+        stop=40,
+        cols=SMS_VALID_RECORD_TYPES,
+        filters=[
+            (0, 2, SMS_VALID_TC),
+            (3, 4, SMS_VALID_TCSN),
+            (16, 26, SMS_VALID_TYPES),
+            (34, 37, SMS_VALID_RAW_DATA_VERSION),
+        ],
+    )
     log.logger.info(f"Saving Raw SMS Transactions from {client_id} file {file_id}")
-    fs.write_parquet(drafts_df, target_layer, client_id, file_id, subdir=target_subdir)
+    fs.write_parquet_table(
+        drafts,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
+
+
+def _save_vss_type(
+    vss_table: pa.Table,
+    vss_type: str,
+    target_layer: FileStorage.Layer,
+    client_id: str,
+    file_id: str,
+    target_subdir: str,
+) -> None:
+    """
+    Save pivoted VSS records of a single variant.
+    """
+    if len(vss_table) == 0:
+        log.logger.warning(
+            f"No records found for VSS type {vss_type} in {client_id} file {file_id}"
+        )
+        return
+    log.logger.info(
+        f"Saving {len(vss_table)} Raw VSS {vss_type} records "
+        f"from {client_id} file {file_id}"
+    )
+    fs.write_parquet_table(
+        vss_table,
+        target_layer,
+        client_id,
+        file_id,
+        subdir=target_subdir,
+        **PARQUET_OPTIONS,
+    )
 
 
 def transform_vss_records(
@@ -138,67 +176,61 @@ def transform_vss_records(
                                If None, uses default: "100-BASEII_RAW_VSS_{vss_type}"
 
     """
-    VSS_POS_START = 60
-    VSS_POS_END = 63
-    VSS_SUFFIX_START = 63
-    VSS_SUFFIX_END = 65
-    VSS_SUFFIX_VALUE = "  "
-    VALID_VSS_TYPES = ["110", "120", "130", "140"]
-
     if vss_types is None:
-        vss_types = VALID_VSS_TYPES.copy()
+        vss_types = list(VSS_VALID_TYPES)
     
     # Default template if not provided
     if target_subdir_template is None:
         target_subdir_template = "100-BASEII_RAW_VSS_{vss_type}"
 
-    VALID_TC = ["46"]
-    VALID_TCSN = ["0","1"]
-
     log.logger.info(f"Opening {client_id} file {file_id} as CTF")
-    ctf_records = _load_as_ctf(origin_layer, client_id, file_id, subdir=origin_subdir)
-    log.logger.info(f"Extracting Raw VSS records (all types) from {client_id} file {file_id}")
-    vss_records = ctf_records[
-        ctf_records.str.slice(stop=2).isin(VALID_TC)
-        & ctf_records.str.slice(start=3, stop=4).isin(VALID_TCSN)
-    ]
-    
-    # Pivot once for all VSS records
-    vss_df = _pivot_values_on_key(vss_records, start=3, stop=4, cols=VALID_TCSN)
-    
-    # Now filter and save for each VSS type
+    ctf_records = load_ctf_bytes(origin_layer, client_id, file_id, subdir=origin_subdir)
     log.logger.info(f"Processing VSS variants: {', '.join(vss_types)}")
 
+    valid_vss_types = []
     for vss_type in vss_types:
-        try:
-            if vss_type not in VALID_VSS_TYPES:
-                log.logger.warning(f"Skipping invalid VSS type: {vss_type}")
-                continue
-            
-            log.logger.info(f"Filtering for VSS type {vss_type}")
-            vss_df_filtered = vss_df[
-                (vss_df["0"].str.slice(start=VSS_POS_START, stop=VSS_POS_END) == vss_type)
-                & (vss_df["0"].str.slice(start=VSS_SUFFIX_START, stop=VSS_SUFFIX_END) == VSS_SUFFIX_VALUE)
-            ]
-
-            if len(vss_df_filtered) == 0:
-                log.logger.warning(f"No records found for VSS type {vss_type} in {client_id} file {file_id}")
-                continue
-                
-            # Construct target subdir for this VSS type
-            target_subdir = target_subdir_template.format(vss_type=vss_type)
-            log.logger.info(f"Saving {len(vss_df_filtered)} Raw VSS {vss_type} records from {client_id} file {file_id}")
-            fs.write_parquet(
-                vss_df_filtered,
+        if vss_type not in VSS_VALID_TYPES:
+            log.logger.warning(f"Skipping invalid VSS type: {vss_type}")
+            continue
+        valid_vss_types.append(vss_type)
+
+    log.logger.info(f"Extracting Raw VSS records from {client_id} file {file_id}")
+    # Records are split by variant while pivoting, from the type of their TCSN 0 line.
+    vss_tables = pivot_groups_on_key(
+        ctf_records,
+        start=3,
+        stop=4,
+        cols=VSS_VALID_TCSN,
+        group_col="0",
+        group_start=VSS_TYPE_START,
+        group_stop=VSS_SUFFIX_END,
+        groups=[f"{vss_type}{VSS_SUFFIX_VALUE}" for vss_type in valid_vss_types],
+        filters=[(0, 2, VSS_VALID_TC), (3, 4, VSS_VALID_TCSN)],
+    )
+
+    # Each variant writes its own file, so they are saved concurrently.
+    with ThreadPoolExecutor(max_workers=max(len(valid_vss_types), 1)) as executor:
+        futures = {
+            vss_type: executor.submit(
+                _save_vss_type,
+                vss_tables[f"{vss_type}{VSS_SUFFIX_VALUE}"],
+                vss_type,
                 target_layer,
                 client_id,
                 file_id,
-                subdir=target_subdir,
+                target_subdir_template.format(vss_type=vss_type),
             )
-
-        except Exception as e:
-            log.logger.error(f"Error processing VSS type {vss_type} from {client_id} file {file_id}: {e}")
-            raise
+            for vss_type in valid_vss_types
+        }
+        for vss_type, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log.logger.error(
+                    f"Error processing VSS type {vss_type} "
+                    f"from {client_id} file {file_id}: {e}"
+                )
+                raise
 
     # Filter for specific VSS type
     # vss_df_filter = vss_df[